@@ -0,0 +1,284 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+import project
+
+# Benchmarks for the hot paths of Brainstorm Blitz!
+# Every benchmark reports the median, minimum and maximum time of its runs in seconds.
+# Results are written as JSON so runs on different commits can be compared with --compare.
+#
+# Usage:
+#   python benchmark.py --output results.json
+#   python benchmark.py --compare results.json
+
+
+# Builds an API style response with the given amount of questions.
+# The text contains HTML entities like the real API, so text_cleanup has work to do
+def make_payload(amount, question_type="multiple"):
+    results = []
+    for i in range(amount):
+        if question_type == "boolean":
+            correct_answer, incorrect_answers = "True", ["False"]
+        else:
+            correct_answer = f"Correct &amp; answer {i}"
+            incorrect_answers = [f"Wrong &quot;answer&quot; {i}.{j}" for j in range(3)]
+        results.append({"type": question_type, "difficulty": "easy", "category": "General Knowledge",
+                        "question": f"Which of these is &quot;question&quot; number {i}? It&#039;s a test",
+                        "correct_answer": correct_answer, "incorrect_answers": incorrect_answers})
+    return {"response_code": 0, "results": results}
+
+
+# Local stand-in for opentdb.com. Every response waits for the injected latency before it is sent
+class StubHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+
+        if url.path == "/api_token.php":
+            body = {"response_code": 0, "token": "benchmark"}
+        elif url.path == "/api.php":
+            body = make_payload(int(params.get("amount", ["10"])[0]), params.get("type", ["multiple"])[0])
+        elif url.path == "/api_count.php":
+            body = {"category_id": int(params.get("category", ["9"])[0]),
+                    "category_question_count": {"total_question_count": 300, "total_easy_question_count": 100,
+                                                "total_medium_question_count": 100, "total_hard_question_count": 100}}
+        else:
+            self.send_error(404)
+            return
+
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    # Keep the benchmark output free of request logs
+    def log_message(self, format, *args):
+        pass
+
+
+# Starts the stub API on a free local port and points the game at it
+def start_stub_server(latency):
+    StubHandler.latency = latency
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    project.api_base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    # The stub has no rate limit, so requests are not spaced out like they are for opentdb
+    project.api_rate_limit = 0.0
+    return server
+
+
+# Runs a function the given amount of times and returns its timings.
+# Fast functions are called `number` times per run and timed per call, to keep timer noise out of the results
+def measure(function, runs, setup=None, number=1):
+    timings = []
+    for _ in range(runs):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        timings.append((time.perf_counter() - start) / number)
+    return {"median": statistics.median(timings), "min": min(timings), "max": max(timings), "runs": runs}
+
+
+# Points every game file at a fresh temporary directory so benchmarks never touch real data
+def use_temporary_files(directory):
+    project.leaderboard_file = os.path.join(directory, "leaderboard.txt")
+    project.leaderboard_db_file = os.path.join(directory, "leaderboard.db")
+    project.question_bank_file = os.path.join(directory, "question_bank.json")
+    project.count_cache_file = os.path.join(directory, "question_counts.json")
+    project.render_cache_file = os.path.join(directory, "render_cache.json")
+    project.categories_file = os.path.join(directory, "categories.json")
+    project.seen_questions_dir = os.path.join(directory, "seen_questions")
+    project.daily_dir = os.path.join(directory, "daily")
+    project.boards_dir = os.path.join(directory, "leaderboards")
+    project.leaderboard = None
+    project.leaderboard_writer = None
+    project.question_bank = None
+    project.count_cache = None
+    project.render_cache = None
+    # The stub API's session token must never be saved for, or sent by, the real game
+    project.api_token = None
+    project.seen_questions = None
+
+
+# Fills a leaderboard backend with the given amount of random entries
+def fill_leaderboard(backend, rows):
+    entries = [(f"player{i}", random.randint(0, 1500), random.randint(0, 50), random.randint(1, 50), random.randint(0, 10))
+               for i in range(rows)]
+    entries.sort(key=lambda entry: entry[1], reverse=True)
+    # The SQLite backend imports the leaderboard.txt file on first use, like a real migration would
+    project.export_leaderboard(project.leaderboard_file, entries)
+    project.get_leaderboard()
+
+
+def benchmark_parsing(results, runs):
+    payload = make_payload(50)
+    texts = [result["question"] for result in payload["results"]]
+    results["get_questions[50]"] = measure(lambda: project.get_questions(payload), runs, number=200)
+    results["get_answers[50]"] = measure(lambda: project.get_answers(payload), runs, number=200)
+    results["text_cleanup[50]"] = measure(lambda: [project.text_cleanup(text) for text in texts], runs, number=200)
+
+
+def benchmark_leaderboard(results, rows, runs):
+    for backend in ["sqlite", "text"]:
+        with tempfile.TemporaryDirectory() as directory:
+            use_temporary_files(directory)
+            os.environ["BRAINSTORM_LEADERBOARD"] = backend
+            fill_leaderboard(backend, rows)
+
+            results[f"add_to_leaderboard[{backend},{rows}]"] = measure(
+                lambda: project.add_to_leaderboard("benchmark", random.randint(0, 1500), 3, 10, 1), runs)
+            with contextlib.redirect_stdout(io.StringIO()):
+                results[f"display_leaderboard[{backend},{rows}]"] = measure(project.display_leaderboard, runs, number=20)
+
+            if backend == "sqlite":
+                project.get_leaderboard().close()
+            project.leaderboard = None
+    os.environ.pop("BRAINSTORM_LEADERBOARD", None)
+
+
+# Time from the settings being picked to the questions being ready, with an empty question bank and a warm one
+def benchmark_quiz_start(results, latency, runs):
+    with tempfile.TemporaryDirectory() as directory:
+        use_temporary_files(directory)
+        server = start_stub_server(latency)
+        try:
+            # Every run starts with an empty bank, so the API is always waited on
+            def empty_bank():
+                project.question_bank = {}
+            results[f"quiz_start[api,{latency}s]"] = measure(
+                lambda: project.fetch_quiz("9", 10, "easy", "multiple"), runs, setup=empty_bank)
+
+            # Every run starts with a full bank, so the quiz is drawn locally
+            def full_bank():
+                project.question_bank = {}
+                questions, all_answers = project.get_questions(make_payload(50)), project.get_answers(make_payload(50))
+                project.question_bank[project.bank_key("9", "easy", "multiple")] = [
+                    [question, answers, correct_answer] for question, (answers, correct_answer) in zip(questions, all_answers)]
+            results[f"quiz_start[bank,{latency}s]"] = measure(
+                lambda: project.draw_from_question_bank("9", 10, "easy", "multiple"), runs, setup=full_bank)
+
+            results[f"question_count[api,{latency}s]"] = measure(
+                lambda: project.fetch_question_counts("9"), runs)
+        finally:
+            server.shutdown()
+
+
+# Time to open a question pack and draw a quiz from it, with every question under one key
+def benchmark_question_pack(results, size, runs):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "questions.pack")
+        questions, all_answers = project.get_questions(make_payload(size)), project.get_answers(make_payload(size))
+        project.write_question_pack(path, {project.bank_key("9", "easy", "multiple"): [
+            [question, answers, correct_answer] for question, (answers, correct_answer) in zip(questions, all_answers)]})
+
+        results[f"question_pack_open[{size}]"] = measure(lambda: project.QuestionPack(path).close(), runs, number=20)
+        pack = project.QuestionPack(path)
+        results[f"quiz_start[pack,{size}]"] = measure(lambda: pack.draw("9", 10, "easy", "multiple"), runs, number=200)
+        pack.close()
+
+
+# Time for a fresh interpreter to import the game and draw the main menu title and table.
+# "cold" renders everything from scratch, "warm" reads the renderings from a render_cache.json in a temporary directory
+def benchmark_startup(results, runs):
+    directory = os.path.dirname(os.path.abspath(__file__))
+    with tempfile.TemporaryDirectory() as cache_directory:
+        startup = (f"import project; project.render_cache_file = {os.path.join(cache_directory, 'render_cache.json')!r}; "
+                   "project.render_banner('Brainstorm Blitz!'); "
+                   "project.render_table([['1.', 'PLAY!']], headers=['Choice No.', 'Main Menu'], tablefmt='rounded_grid')")
+
+        def start(environment):
+            subprocess.run([sys.executable, "-c", startup], cwd=directory, env={**os.environ, **environment}, check=True)
+
+        results["startup[cold]"] = measure(lambda: start({"BRAINSTORM_RENDER_CACHE": "0"}), runs)
+
+        # Renders once so the cache file exists before the warm runs
+        start({})
+        results["startup[warm]"] = measure(lambda: start({}), runs)
+
+
+# Commit the results were measured on, so saved results can be matched to the code
+def current_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+# Prints each benchmark next to the baseline and returns the names of the ones slower than the threshold allows
+def compare(results, baseline, threshold):
+    regressions = []
+    print(f"\n{'Benchmark':<40} {'Baseline':>12} {'Current':>12} {'Change':>8}")
+    for name, result in results.items():
+        if name not in baseline.get("results", {}):
+            print(f"{name:<40} {'-':>12} {result['median']:>12.6f} {'new':>8}")
+            continue
+        before = baseline["results"][name]["median"]
+        change = result["median"] / before - 1 if before else 0.0
+        print(f"{name:<40} {before:>12.6f} {result['median']:>12.6f} {change:>+8.1%}")
+        if change > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks for Brainstorm Blitz!")
+    parser.add_argument("--runs", type=int, default=20, help="runs per benchmark (default: 20)")
+    parser.add_argument("--rows", type=int, default=100_000, help="leaderboard size (default: 100000)")
+    parser.add_argument("--latency", type=float, default=0.05, help="latency injected by the stub API in seconds (default: 0.05)")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--compare", metavar="BASELINE", help="compare with results saved by an earlier --output")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="slowdown that counts as a regression when comparing (default: 0.25)")
+    args = parser.parse_args()
+
+    # Same random entries on every run, so leaderboards are comparable across commits
+    random.seed(0)
+
+    results = {}
+    benchmark_startup(results, max(1, args.runs // 4))
+    benchmark_parsing(results, args.runs)
+    benchmark_leaderboard(results, args.rows, max(1, args.runs // 4))
+    benchmark_quiz_start(results, args.latency, max(1, args.runs // 4))
+    benchmark_question_pack(results, args.rows, args.runs)
+
+    report = {"commit": current_commit(), "python": platform.python_version(), "rows": args.rows,
+              "latency": args.latency, "results": results}
+
+    print(f"{'Benchmark':<40} {'Median':>12} {'Min':>12} {'Max':>12}")
+    for name, result in results.items():
+        print(f"{name:<40} {result['median']:>12.6f} {result['min']:>12.6f} {result['max']:>12.6f}")
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+
+    if args.compare:
+        with open(args.compare, "r") as file:
+            regressions = compare(results, json.load(file), args.threshold)
+        if regressions:
+            sys.exit(f"\nRegressions: {', '.join(regressions)}")
+
+
+if __name__ == "__main__":
+    main()
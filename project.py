@@ -1,33 +1,243 @@
-import requests
 import random
 import html
 import sys
 import os
-from tabulate import tabulate
-from pyfiglet import Figlet
+import json
+import threading
+import argparse
+import time
+from collections import OrderedDict
+import importlib
+import functools
+import hashlib
+import struct
+import queue
+import atexit
+import builtins
+import contextlib
+import mmap
+import bisect
 
-# Initialize figlet which is for the stylized titles
-figlet = Figlet()
 
-# Setfont for figlet. "slant" is the name of the font
-figlet.setFont(font = "slant")
+# Stands in for a module and only imports it the first time one of its attributes is used.
+# requests, tabulate, pyfiglet, sqlite3 and asyncio take most of the startup time, and many runs never need all of them
+class LazyModule:
+    def __init__(self, name):
+        self.name = name
+        self.module = None
+
+    def __getattr__(self, attribute):
+        if self.module is None:
+            self.module = importlib.import_module(self.name)
+        return getattr(self.module, attribute)
+
+
+requests = LazyModule("requests")
+tabulate_module = LazyModule("tabulate")
+pyfiglet = LazyModule("pyfiglet")
+sqlite3 = LazyModule("sqlite3")
+asyncio = LazyModule("asyncio")
+http_server = LazyModule("http.server")
+urllib_parse = LazyModule("urllib.parse")
+
+# Figlet is for the stylized titles, created the first time a title is rendered
+figlet = None
+
+# States of the game loop in run_game
+MENU = "menu"
+PLAY = "play"
+DAILY = "daily"
+EXIT = "exit"
 
 # Relative file path for correct placement and reading of leaderboard file
 base_dir = os.path.dirname(os.path.abspath(__file__))
 leaderboard_file = os.path.join(base_dir, "leaderboard.txt")
+leaderboard_db_file = os.path.join(base_dir, "leaderboard.db")
+question_bank_file = os.path.join(base_dir, "question_bank.json")
+render_cache_file = os.path.join(base_dir, "render_cache.json")
+categories_file = os.path.join(base_dir, "categories.json")
+seen_questions_dir = os.path.join(base_dir, "seen_questions")
+daily_dir = os.path.join(base_dir, "daily")
+boards_dir = os.path.join(base_dir, "leaderboards")
+count_cache_file = os.path.join(base_dir, "question_counts.json")
+
+# Offline mode serves every quiz from the local question bank and never touches the API
+offline_mode = False
+
+# Local question bank, loaded lazily from question_bank.json.
+# Maps "category|difficulty|type" to a list of [question, answers, correct_answer] entries,
+#   already cleaned up by get_questions/get_answers
+question_bank = None
+question_bank_lock = threading.Lock()
+
+# Modification time and size of question_bank.json when this process last read or wrote it
+question_bank_version = None
+
+# Questions this process has drawn from the bank since it was last saved, by bank key.
+# Draws only change the bank in memory, so they never wait on a rewrite of question_bank.json.
+# The removals are saved with the next refill, at the end of an adaptive quiz or when the game exits,
+#   and applied again whenever the bank is re-read because another process saved it
+question_bank_removed = {}
+
+# API client settings. The base URL and timeouts can be changed with environment variables,
+#   for example to point the game at a local copy of the API
+api_base_url = os.environ.get("OPENTDB_URL", "https://opentdb.com").rstrip("/")
+api_connect_timeout = float(os.environ.get("OPENTDB_CONNECT_TIMEOUT", "3.05"))
+api_read_timeout = float(os.environ.get("OPENTDB_READ_TIMEOUT", "10"))
+api_max_attempts = int(os.environ.get("OPENTDB_MAX_ATTEMPTS", "4"))
+
+# opentdb only allows one request every 5 seconds per IP
+api_rate_limit = 5.0
+
+# Shared API session and opentdb session token, created on first use
+api_session = None
+api_token = None
+api_lock = threading.Lock()
+
+# Held while the session token is checked and requested, so threads starting together share one token.
+# The generation counts token replacements and resets, so a token is only replaced or reset once
+api_token_lock = threading.Lock()
+api_token_generation = 0
+
+# Earliest time the next background request may be sent. Every request moves it on by api_rate_limit,
+#   so requests made ahead of the player stay out of the way of the player's own requests
+api_next_allowed = 0.0
+
+# Time until which no request is sent at all, set whenever opentdb reports the rate limit
+api_backoff_until = 0.0
+
+# Marks the threads that fetch ahead of the player, see start_background_thread
+api_thread = threading.local()
+
+# opentdb's categories by API ID, used until api_category.php has been fetched or when it can't be reached.
+# Subcategories are named "Group: Name", like the API names them
+builtin_categories = [("9", "General Knowledge"), ("10", "Entertainment: Books"), ("11", "Entertainment: Film"),
+                      ("12", "Entertainment: Music"), ("13", "Entertainment: Musicals & Theatres"),
+                      ("14", "Entertainment: Television"), ("15", "Entertainment: Video Games"),
+                      ("16", "Entertainment: Board Games"), ("17", "Science & Nature"), ("18", "Science: Computers"),
+                      ("19", "Science: Mathematics"), ("20", "Mythology"), ("21", "Sports"), ("22", "Geography"),
+                      ("23", "History"), ("24", "Politics"), ("25", "Art"), ("26", "Celebrities"), ("27", "Animals"),
+                      ("28", "Vehicles"), ("29", "Entertainment: Comics"), ("30", "Science: Gadgets"),
+                      ("31", "Entertainment: Japanese Anime & Manga"), ("32", "Entertainment: Cartoon & Animations")]
+
+# Category registry, loaded once by get_category_registry
+category_registry = None
+category_registry_lock = threading.Lock()
+
+# Age after which categories.json is refreshed from the API in the background
+category_refresh_age = 7 * 24 * 60 * 60
+
+# Rendered titles and static tables, loaded lazily from render_cache.json.
+# Set BRAINSTORM_RENDER_CACHE=0 to keep the cache in memory only
+render_cache = None
+render_cache_lock = threading.Lock()
+render_cache_persisted = os.environ.get("BRAINSTORM_RENDER_CACHE", "1") != "0"
+
+# Bumped whenever rendering changes, so an old render_cache.json is thrown away
+render_cache_version = 1
+
+# Leaderboard backend, created on first use by get_leaderboard
+leaderboard = None
+leaderboard_lock = threading.Lock()
+leaderboard_writer = None
+
+# Leaderboards of their own, like the daily challenge's, and their writers, by board name.
+# Each board keeps its scores in boards_dir
+board_leaderboards = {}
+board_writers = {}
+
+# Entries shown by display_leaderboard and per page when browsing
+leaderboard_page_size = 10
+
+# Most entries the HTTP leaderboard hands out per request, and most responses it keeps cached
+http_leaderboard_limit = 100
+http_cache_size = 1024
+
+# Question count cache, loaded lazily from question_counts.json.
+# Maps category ID to its counts and the time they were fetched, in least recently used order
+count_cache = None
+count_cache_lock = threading.Lock()
+count_cache_ttl = float(os.environ.get("BRAINSTORM_COUNT_TTL", 24 * 60 * 60))
+count_cache_size = 64
+
+# Player whose seen questions and session token are used, set with --player
+player_name = os.environ.get("BRAINSTORM_PLAYER", "guest")
+
+# Questions the player has seen, loaded on first use by get_seen_questions
+seen_questions = None
+
+# Batches of questions loaded to replace seen ones before repeats are allowed
+seen_fetch_attempts = 3
+
+# Seen questions remembered per generation. Two generations are kept, so memory stays bounded however much a player plays
+seen_capacity = 20000
+
+# opentdb deletes session tokens after 6 hours of inactivity
+api_token_lifetime = 6 * 60 * 60
+
+# The next quiz, loaded on a background thread while the current one is being played.
+# Holds the settings it was loaded for, the loading thread and the loaded questions and answers
+prefetched_quiz = None
 
+# Largest amount of questions the API hands out per request, used when refilling the bank
+bank_refill_amount = 50
 
+# Largest marathon quiz, fetched in batches of bank_refill_amount
+max_quiz_questions = 1000
+
+# Read-only question pack opened with --pack, drawn from before the question bank
+question_pack = None
+
+# Question pack file layout: the header holds the magic, the format version and the position and length of the index.
+# Bump question_pack_version whenever the layout changes
+question_pack_magic = b"BBQP"
+question_pack_version = 1
+question_pack_header = struct.Struct("<4sHQI")
+question_pack_offset = struct.Struct("<Q")
+
+# The daily challenge: one quiz a day, the same for every player. Each day's quiz is saved in daily_dir
+#   the first time it is played, and every later player gets the saved copy without touching the API
+daily_question_amount = 10
+daily_quiz = None
+daily_lock = threading.Lock()
+
+# Bank keys with a refill running, so the same settings are never refilled twice at once.
+# Maps each key to an event that is set once its refill is done
+refills_in_flight = {}
+
+# The bank is refilled in the background once it holds fewer questions than this for some settings,
+#   or fewer than the quiz just played, so the next quiz can still be drawn from it
+pool_low_water = 10
+
+
+# Runs the game as a loop over screens instead of screens calling each other.
+# Every screen returns the next state, so the call stack stays the same size no matter how many games are played
+def run_game():
+    state = MENU
+    while state != EXIT:
+        if state == MENU:
+            state = main_menu()
+        elif state == PLAY:
+            state = start_game()
+        elif state == DAILY:
+            state = start_daily_challenge()
+
+
+# Shows the main menu and returns the next state of the game
 def main_menu():
     # Main menu options table
     game_modes = [["1.", "PLAY!"],
-                  ["2.", "LEADERBOARD"],
-                  ["3.", "EXIT GAME"]]
-    print("\n"*35)
+                  ["2.", "DAILY CHALLENGE"],
+                  ["3.", "LEADERBOARD"],
+                  ["4.", "BROWSE LEADERBOARD"],
+                  ["5.", "EXIT GAME"]]
+    frame = Frame(clear_lines=35)
     # Print stylized title
-    print(figlet.renderText("Brainstorm Blitz!"))
+    frame.print(render_banner("Brainstorm Blitz!"))
 
     # Print main menu options table in 'pretty' format using tabulate
-    print(tabulate(game_modes, headers=["Choice No.", "Main Menu"], tablefmt="rounded_grid", colalign=("center","center")))
+    frame.print(render_table(game_modes, headers=["Choice No.", "Main Menu"], tablefmt="rounded_grid", colalign=("center","center")))
+    frame.show()
     
     # Main menu logic 
     while True:
@@ -40,14 +250,21 @@ def main_menu():
             match int(menu_choice):
                 case 1:
                     # Launches game and exits out of main menu loop
-                    start_game()
-                    break
+                    return PLAY
                 
                 case 2:
+                    # Launches today's daily challenge
+                    return DAILY
+
+                case 3:
                     # Displays leaderboard and reprompts user for main menu option select.
                     display_leaderboard()
+
+                case 4:
+                    # Pages through the whole leaderboard, then reprompts user for main menu option select.
+                    browse_leaderboard()
                 
-                case 3:
+                case 5:
                     while True:
                         # Prompts the user for confirmation to exit the game and reprompts if invalid input
                         confirmation = input("Are you sure you want to exit? (Y/N): ").strip().upper()
@@ -64,51 +281,169 @@ def main_menu():
             print("Please enter a valid number.")
 
 
-# Start game logic
+# Start game logic. Returns the next state of the game once the quiz is over or the player backs out
 def start_game():
 
     # Prompts the user for a category choice
     category = get_category()
 
     # The get_category function will return None if the user chooses to return to main menu
-    # The main menu is started, and returns out of the start_game logic
+    # Returns out of the start_game logic, back to the main menu
     if category is None:
-        main_menu()
-        return
+        return MENU
 
     # Prompts the user for amount of questions, difficulty, and question type
     question_amount = get_questions_amount()
     difficulty = get_difficulty()
     question_type = get_question_type()
 
-    # Default structuring for the API URL, plugging in the values from the user prompts
-    url = f"https://opentdb.com/api.php?amount={question_amount}&difficulty={difficulty}&type={question_type}"
+    # Batches of a marathon quiz that are still on their way
+    more = None
 
-    # If the user selects 'All categories', it will use the default URL. 
-    # No specified category, the API will return questions from all categories
-    # But if the user selects a category, concatenate the category parameter onto the URL, pluggin in the category ID
-    if category != "all categories":
-        url += f"&category={category}"
+    # Serve the quiz from the local question bank first, only waiting on the API when the bank runs dry
+    try:
+        # Adaptive quizzes draw one question at a time, at the difficulty the player's streak calls for
+        if difficulty == "adaptive":
+            more = AdaptiveQuiz(category, question_amount, question_type, get_seen_questions())
+            questions, all_answers = more.draw(0) or ([], [])
 
-    # Get the json response with the URL and extract the questions and answers
-    json_url = requests.get(url).json()
-    questions = get_questions(json_url)
-    all_answers = get_answers(json_url)
+        # Marathon quizzes are fetched from the API in batches, play starts as soon as the first batch is in
+        elif question_amount > bank_refill_amount and not offline_mode:
+            more = fetch_in_batches(category, question_amount, difficulty, question_type, get_seen_questions())
+            first_batch = more.get()
+            if isinstance(first_batch, Exception):
+                raise first_batch
+            questions, all_answers = first_batch or ([], [])
+
+        # A replay with the same settings gets the quiz that was prefetched during the last game
+        elif (prefetched := take_prefetched_quiz(category, question_amount, difficulty, question_type)) is not None:
+            questions, all_answers = prefetched
+        else:
+            questions, all_answers = get_quiz(category, question_amount, difficulty, question_type, get_seen_questions())
+    except (requests.RequestException, TriviaAPIError) as error:
+        # Network problems and API errors send the player back to the main menu instead of crashing the game
+        print(f"\nCould not load the quiz: {error}")
+        return MENU
+
+    # Offline mode with nothing stored for these settings, nothing to play
+    if not questions:
+        print("\nNo stored questions for these settings. Play online once to fill the question bank.")
+        return MENU
+
+    # Remember the questions of this quiz, so the player's next quizzes skip them
+    seen = get_seen_questions()
+    seen.update(questions)
+    seen.save()
     
-    print("\n"*20)
+    # Load the next quiz with the same settings while this one is played.
+    # Marathon quizzes already keep the API busy, so they are not prefetched
+    if more is None:
+        prefetch_next_quiz(category, question_amount, difficulty, question_type)
 
     # After all the user prompting, display quiz
-    print(figlet.renderText("Quiz Started!"))
-    display_quiz(questions, all_answers, question_type)
+    frame = Frame(clear_lines=20)
+    frame.print(render_banner("Quiz Started!"))
+    frame.show()
+    return display_quiz(questions, all_answers, question_type, more, question_amount)
+
+
+# Starts today's daily challenge. Returns the next state of the game, like start_game.
+# Scores go to the day's own leaderboard, so every score on it was played on the same questions
+def start_daily_challenge():
+    day = daily_challenge_day()
+    try:
+        quiz = get_daily_quiz(day)
+    except (requests.RequestException, TriviaAPIError, ValueError) as error:
+        print(f"\nCould not load the daily challenge: {error}")
+        return MENU
+
+    if quiz is None:
+        print("\nToday's daily challenge hasn't been created yet. Play it online once to create it.")
+        return MENU
+
+    questions, all_answers = quiz
+    frame = Frame(clear_lines=20)
+    frame.print(render_banner("Daily Challenge!"))
+    frame.print(f"\n{day}: {len(questions)} questions, the same for every player today.")
+    frame.show()
+    return display_quiz(questions, all_answers, "multiple", board=daily_board(day))
+
+
+# Today's date, which names the daily challenge and its leaderboard
+def daily_challenge_day():
+    return time.strftime("%Y-%m-%d")
+
+
+# Name of the leaderboard board of a day's daily challenge
+def daily_board(day):
+    return f"daily-{day}"
+
+
+# Gets a day's daily challenge as (questions, all_answers), creating and saving it if nobody has played it yet.
+# Returns None if it doesn't exist yet and can't be created, offline with nothing stored
+def get_daily_quiz(day):
+    global daily_quiz
+    with daily_lock:
+        if daily_quiz is not None and daily_quiz[0] == day:
+            return daily_quiz[1]
+
+        path = os.path.join(daily_dir, f"{day}.json")
+        try:
+            with open(path, "r") as file:
+                quiz = json.load(file)
+        except FileNotFoundError:
+            quiz = build_daily_quiz(day, path)
+            if quiz is None:
+                return None
+
+        daily_quiz = (day, (quiz["questions"], quiz["all_answers"]))
+        return daily_quiz[1]
+
+
+# Creates a day's daily challenge and saves it to path. The settings, question order and answer order all come
+#   from a random generator seeded with the day, so the quiz never depends on how the questions were loaded.
+# If another player's game saved the day's quiz first, that quiz is used instead, so there is only ever one
+def build_daily_quiz(day, path):
+    rng = random.Random(f"daily-challenge-{day}")
+    difficulty = rng.choice(["easy", "medium", "hard"])
+    drawn = load_quiz("all categories", daily_question_amount, difficulty, "multiple")
+    if not drawn or not drawn[0]:
+        return None
+
+    entries = sorted(zip(drawn[0], drawn[1]))
+    rng.shuffle(entries)
+    questions = []
+    all_answers = []
+    for question, (answers, correct_answer) in entries:
+        answers = sorted(answers)
+        rng.shuffle(answers)
+        questions.append(question)
+        all_answers.append([answers, correct_answer])
+    quiz = {"day": day, "difficulty": difficulty, "questions": questions, "all_answers": all_answers}
 
+    # Written to a temporary file first and then linked in place, which fails if the quiz already exists
+    os.makedirs(daily_dir, exist_ok=True)
+    temp_file = f"{path}.{os.getpid()}.tmp"
+    with open(temp_file, "w") as file:
+        json.dump(quiz, file)
+    try:
+        os.link(temp_file, path)
+    except FileExistsError:
+        with open(path, "r") as file:
+            quiz = json.load(file)
+    finally:
+        os.remove(temp_file)
+    return quiz
 
-# Prompts user for question amount they want to play for. 1 to 50 is the hard limit set by the API.
+
+# Prompts user for question amount they want to play for. 50 is the limit of one API request,
+#   bigger marathon quizzes are fetched in batches while they are played
 def get_questions_amount():
     while True:
         # Prompts the user, validates the input and returns the question amount
         try:
-            amount = int(input("How many questions would you like to play for (1 - 50)? "))
-            if 1 <= amount <= 50:
+            amount = int(input(f"How many questions would you like to play for (1 - {max_quiz_questions})? "))
+            if 1 <= amount <= max_quiz_questions:
                 return amount
             else:
                 raise ValueError
@@ -119,64 +454,19 @@ def get_questions_amount():
 
 
 # Prompts the user for category selection
+# The menus come from the category registry, so new opentdb categories show up without code changes
 def get_category():
-    
-    # Main category table
-    top_level_categories = [["1.", "Animals"], 
-                            ["2.", "Art"], 
-                            ["3.", "Celebrities"], 
-                            ["4.", "Entertainment +"], 
-                            ["5.", "General Knowledge"], 
-                            ["6.", "Geography"], 
-                            ["7.", "History"], 
-                            ["8.", "Mythology"], 
-                            ["9.", "Politics"], 
-                            ["10.", "Science +"], 
-                            ["11.", "Science & Nature"], 
-                            ["12.", "Sports"], 
-                            ["13.", "Vehicles"],
-                            ["14.", "All Categories"],
-                            ["15.", "One Random Category"],
-                            ["0.", "Back to Menu"]]
-    
-    # ID dictionary for main category choices. (Ex: if user selects Animals(1) the ID for that within the database API is 27)
-    top_level_id_dict = {"1":"27", "2":"25", "3":"26", "5":"9", "6":"22", "7":"23",
-                         "8":"20", "9":"24", "11":"17", "12":"21", "13":"28"}
-    
-    # Entertainment sub-categories table
-    entertainment = [["1.","Board Games"],
-                     ["2.","Books"],
-                     ["3.","Cartoon & Animations"],
-                     ["4.","Comics"],
-                     ["5.","Film"],
-                     ["6.","Japanese Anime & Manga"],
-                     ["7.","Musicals & Theatres"],
-                     ["8.","Music"],
-                     ["9.","Television"],
-                     ["10.","Video Games"],
-                     ["0.", "Back to Categories"]]
-    
-    # ID conversion again
-    entertainment_id_dict = {"1":"16", "2":"10", "3":"32", "4":"29", "5":"11", 
-                             "6":"31", "7":"13", "8":"12", "9":"14", "10":"15"}
-    
-    # Science sub-categories table
-    science = [["1.","Computers"],
-               ["2.","Gadgets"],
-               ["3.","Mathematics"],
-               ["0.", "Back to Categories"]]
-    
-    # ID conversion again
-    science_id_dict = {"1":"18", "2":"30", "3":"19"}
+    registry = get_category_registry()
     
     while True:
-        print("\n"*10)
+        frame = Frame(clear_lines=10)
         # Print Categories with figlet styling
-        print(figlet.renderText('Categories'))
+        frame.print(render_banner('Categories'))
         
         # Prints the categories table
-        print(tabulate(top_level_categories, headers=["Choice No.", "Category Name"], tablefmt="rounded_grid", colalign=("center","center")))
-        print("Categories with '+' have more subcategories to choose from :D\n")
+        frame.print(registry.top_level_table())
+        frame.print("Categories with '+' have more subcategories to choose from :D\n")
+        frame.show()
         
         try:
             selection = input("Desired Category Number: ").strip().strip(".")
@@ -186,105 +476,98 @@ def get_category():
                 return None
             
             # Input validation
-            if int(selection) > 15 or int(selection) < 0:
+            choice = registry.top_level_choice(int(selection))
+            if choice is None:
                 raise ValueError
-            
-            # If user input is in the category dict, return the corresponding value (the category ID)
-            elif selection in top_level_id_dict.keys():
 
-                # Prints the current available amounts of questions. total, easy, medium, and hard
-                print(question_count(top_level_id_dict.get(selection)))
-                return top_level_id_dict.get(selection)
-            
-            else:
-                match int(selection):
-                    # If the user inputs 4, the entertainment category has subcategories within it.
-                    case 4:
-                        while True:
-                            # Input validation, table printing, and appropriate category ID return
-                            print('\n' * 20)
-                            print(figlet.renderText('Entertainment'))
-                            print("Entertainment Sub-categories:")
-                            print(tabulate(entertainment, headers=["Choice No.", "Category Name"], tablefmt="rounded_grid", colalign=("center","center")))
-                            sub_selection = input("Desired Category Number: ").strip().strip(".")
-                            try:
-                                if int(sub_selection) > 10 or int(sub_selection) < 0:
-                                    raise ValueError
-                                
-                                if sub_selection == "0":
-                                    break
-                                else:
-                                    print(question_count(entertainment_id_dict.get(sub_selection)))
-                                    return entertainment_id_dict.get(sub_selection)
-                            except ValueError:
-                                print("Invalid subcategory selection. Please choose a valid option.")
-                    
-                    # Same as entertainment, science also has subcategories within
-                    case 10:
-                        while True:
-                            # Input validation, table printing, and appropriate category ID return
-                            print('\n' * 40)
-                            print(figlet.renderText('Science'))
-                            print("Science Sub-categories:")
-                            print(tabulate(science, headers=["Choice No.", "Category Name"], tablefmt="rounded_grid", colalign=("center","center")))
-                            sub_selection = input("Desired Category Number: ").strip().strip(".")
-                            try:
-                                if int(sub_selection) > 3 or int(sub_selection) < 0:
-                                    raise ValueError
-                                if sub_selection == "0":
-                                    break
-                                else:
-                                    print(question_count(science_id_dict.get(sub_selection)))
-                                    return science_id_dict.get(sub_selection)
-                            except ValueError:
-                                print("Invalid subcategory selection. Please choose a valid option.")
-
-                    # return the string 'all categories' back to the start game function to use the correct URL structure
-                    case 14:
-                        return "all categories"
-                    
-                    # Randomly chooses a category ID and returns it.
-                    case 15:
-                        random_category = random.choice(["9", "10", "11", "12", "13", "14", "15", 
-                                            "16", "17", "18", "19", "20", "21", "22",
-                                            "23", "24", "25", "26", "27", "28", "29",
-                                            "30", "31", "32"])
-                        print(question_count(random_category))
-                        return random_category
+            kind, value = choice
+
+            # A single category, return its ID
+            # Prints the current available amounts of questions. total, easy, medium, and hard
+            if kind == "category":
+                print(question_count(value))
+                return value
+
+            # Groups like Entertainment and Science have subcategories within
+            elif kind == "group":
+                category = get_subcategory(registry, value)
+                if category is not None:
+                    return category
+
+            # return the string 'all categories' back to the start game function to use the correct URL structure
+            elif kind == "all":
+                return "all categories"
+
+            # Randomly chooses a category ID and returns it.
+            elif kind == "random":
+                random_category = random.choice(registry.ids)
+                print(question_count(random_category))
+                return random_category
             
         except ValueError:
             print("Invalid Category Selection.")
             continue
 
 
+# Prompts the user for a subcategory of a group. Returns the category ID, or None to go back to the categories
+def get_subcategory(registry, group):
+    while True:
+        # Input validation, table printing, and appropriate category ID return
+        frame = Frame(clear_lines=20)
+        frame.print(render_banner(group))
+        frame.print(f"{group} Sub-categories:")
+        frame.print(registry.group_table(group))
+        frame.show()
+        sub_selection = input("Desired Category Number: ").strip().strip(".")
+        try:
+            if sub_selection == "0":
+                return None
+            category = registry.group_choice(group, int(sub_selection))
+            if category is None:
+                raise ValueError
+            print(question_count(category))
+            return category
+        except ValueError:
+            print("Invalid subcategory selection. Please choose a valid option.")
+
+
 # Prompts the user for difficulty selection
 def get_difficulty():
     
     print()
     difficulty_table = [["1.", "Easy"],
                         ["2.", "Medium"],
-                        ["3.","Hard"]]
+                        ["3.","Hard"],
+                        ["4.", "Adaptive"]]
     
     # Prints the formatted difficulty table
-    print(tabulate(difficulty_table, headers=["Choice No.", "Difficulty"], tablefmt="rounded_grid", colalign=("center","center")))
+    print(render_table(difficulty_table, headers=["Choice No.", "Difficulty"], tablefmt="rounded_grid", colalign=("center","center")))
     while True:
         # Prompts and if needed, reprompts the user for difficulty selection, and giving multiple options for user input
         # Try-except for input validation
         try:
-            difficulty = input("Select a difficulty: ").lower().strip().strip(".")
-            if difficulty in ["1", "low", "easy", "beginner", "ez"]:
-                return "easy"
-            elif difficulty in ["2","mid", "med", "middle", "medium", "intermediate", "normal"]:
-                return "medium"
-            elif difficulty in ["3", "hard", "tough", "challenge", "difficult", "max"]:
-                return "hard"
-            else:
-                raise ValueError
+            return parse_difficulty(input("Select a difficulty: "))
             
         except Exception:
             print("Invalid difficulty.")
             continue
 
+
+# Turns a difficulty choice into the API difficulty, giving multiple options for user input
+# Raises ValueError if the choice isn't a difficulty
+def parse_difficulty(choice):
+    difficulty = choice.lower().strip().strip(".")
+    if difficulty in ["1", "low", "easy", "beginner", "ez"]:
+        return "easy"
+    elif difficulty in ["2","mid", "med", "middle", "medium", "intermediate", "normal"]:
+        return "medium"
+    elif difficulty in ["3", "hard", "tough", "challenge", "difficult", "max"]:
+        return "hard"
+    elif difficulty in ["4", "adaptive", "auto", "dynamic"]:
+        return "adaptive"
+    else:
+        raise ValueError(f"Invalid difficulty: {choice}")
+
 # Prompts the user for question type
 def get_question_type():
 
@@ -306,43 +589,62 @@ def get_question_type():
             print("Invalid Question Type")
             continue
 
-# Display the quiz itself
-def display_quiz(questions, all_answers, question_type):
-
-    # Tracker variables to keep track of updating values
-    score = 0
-    streak = 0
-    highest_streak = 0
-    total_hints_used = 0
+# Display the quiz itself. A terminal front end for QuizSession, which keeps track of the game
+# Returns the next state of the game: the main menu to play again, or exit
+# For marathon quizzes, `more` is the queue the rest of the batches arrive on and `total` the amount asked for.
+# For adaptive quizzes, `more` is the AdaptiveQuiz the next question is drawn from.
+# `board` is the leaderboard the score is offered to, the main leaderboard if None
+def display_quiz(questions, all_answers, question_type, more=None, total=None, board=None):
+    session = QuizSession(questions, all_answers, question_type)
     
     # List of praises to later be used
     praises_list = ["Good Job!", "Nice Work!", "You're A Genius!!", "Wow!", 
                     "OMG!", "Amazing!", "Spectacular!", "Really Nice!",
                     "Are You Cheating?!", "No Way!", "Insane!", "Outstanding!"]
     
+    # Each answer's result and the next question are drawn together as one frame
+    frame = Frame()
+
     # Loop to iterate through each question
-    for i in range(len(questions)):
-        # Hint used will stay false until the user uses a hint
-        hint_used = False
+    while True:
+        # Out of questions, take the next batch of a marathon quiz. This only waits if the player outran the fetching
+        if session.finished and more is not None:
+            if isinstance(more, AdaptiveQuiz):
+                try:
+                    batch = more.draw(session.streak)
+                except (requests.RequestException, TriviaAPIError) as error:
+                    batch = error
+            else:
+                if more.empty() and len(session.questions) < (total or 0):
+                    frame.print("\nLoading more questions...")
+                    frame.show()
+                batch = more.get()
+            if isinstance(batch, Exception):
+                frame.print(f"\nCould not load more questions: {batch}")
+                batch = None
+            if batch is None:
+                more = None
+                # The API ran out of questions before the quiz was complete
+                if len(session.questions) < (total or 0):
+                    frame.print(f"\nNo more questions available, the quiz ends after {len(session.questions)} questions.")
+                    total = len(session.questions)
+            else:
+                session.add_questions(*batch)
+            continue
+
+        if session.finished:
+            break
+
+        number, question, option_labels, answers = session.current()
 
         # Prints the dynamic question number. Ex: Question 4/11. Displays current question number and total no. of questions
-        print(f"\nQuestion {i + 1}/{len(questions)}: {questions[i]}")
-        
-        # Split the passed in answer list into 2 variables. The 3 wrong answers and the one correct answer
-        answers = all_answers[i][0]
-        correct_answer = all_answers[i][1]
-        
-        # Changes the option labels depending on question type 
-        if question_type == "boolean":
-            option_labels = ["A", "B"]
-            answers = ["True", "False"]
-        elif question_type == "multiple":
-            option_labels = ["A", "B", "C", "D"]
+        frame.print(f"\nQuestion {number}/{max(total or 0, len(session.questions))}: {question}")
 
         # Zips together the answers with the labels. Ex: (A., Option A), (B., Option B).
         answer_table = list(zip(option_labels, answers))
         
-        print(tabulate(answer_table, headers=["Option", "Answer"], tablefmt="rounded_grid"))
+        frame.print(render_table(answer_table, cache=False, headers=["Option", "Answer"], tablefmt="rounded_grid"))
+        frame.show()
         
         # User answer selection and input validation
         # Hint system 
@@ -350,79 +652,196 @@ def display_quiz(questions, all_answers, question_type):
             user_input = input(f"Please enter your answer ({', '.join(option_labels)}). Enter 'H' for a hint(-10 Pts.): ").strip().upper()
             
             # Hint option if user inputs 'H'. Hint only available for multiple choice questions (MCQ). 1 hint per question
-            if user_input == 'H' and question_type == "multiple" and not hint_used:
+            if user_input == 'H' and session.hint_available:
+                frame = Frame()
+                if session.hint():
+                    frame.print(f"Hint used! One wrong answer removed (cost: -10 points).")
+                else:
+                    frame.print("No incorrect answers available to remove.")
 
-                # Leaderboard number of hints used tracker
-                total_hints_used += 1
-
-                # Apply hint is called and returns the updated score (-10pts), hint_used is True, option labels and answers with 1 removed
-                score, hint_used, option_labels, answers = apply_hint(answers, correct_answer, option_labels, score)
-                
                 # Combines the updated option labels with the asnwers
+                number, question, option_labels, answers = session.current()
                 answer_table = list(zip(option_labels, answers))
-                print(tabulate(answer_table, headers=["Option", "Answer"], tablefmt="rounded_grid", colalign=("center","center")))
+                frame.print(render_table(answer_table, cache=False, headers=["Option", "Answer"], tablefmt="rounded_grid", colalign=("center","center")))
+                frame.show()
             elif user_input in option_labels:
                 break
             else:
                 print(f"Invalid input. Please choose one of {option_labels}.")
         
-        # Gets the index of the answer of the user input, and matches the answer at that index to the correct answer.
-        # If user choice is correct, +1 to streak, add to score based off of current score multiplier, display current score. 
-        if answers[option_labels.index(user_input)] == correct_answer:
-            streak += 1
-            score += score_multiplier(streak)
-            print("\n"*30)
-            print(f"{'='*30}")
-            print(f"\nCorrect! {random.choice(praises_list)}\n")
-            print(f"Current streak: 🔥 {streak}")
-            print(f"+{score_multiplier(streak)} points!\n")
-            print(f"CURRENT SCORE: {score} points\n")
-            print(f"{'='*30}")
-            
-            # Keeps track of what was the highest streak that the user achieved.
-            if streak > highest_streak:
-                highest_streak = streak
+        result = session.answer(user_input)
 
-        # If answer is wrong, reset streak, display correct answer, and current score        
+        # If user choice is correct, display the streak, the points added based off of the score multiplier, and current score. 
+        if result["correct"]:
+            frame = Frame(clear_lines=30)
+            frame.print(f"{'='*30}")
+            frame.print(f"\nCorrect! {random.choice(praises_list)}\n")
+            frame.print(f"Current streak: 🔥 {result['streak']}")
+            frame.print(f"+{result['points']} points!\n")
+            frame.print(f"CURRENT SCORE: {result['score']} points\n")
+            frame.print(f"{'='*30}")
+
+        # If answer is wrong, the streak was reset, display correct answer, and current score        
         else:
-            streak = 0
-            print("\n"*30)
-            print(f"\n\n{'='*45}")
-            print(f"\nWhoops! That was wrong. Streak Reset! 🔥 {streak}")
-            print(f"The correct answer was: {correct_answer}\n")
-            print(f"CURRENT SCORE: {score} points\n")
-            print(f"{'='*45}")
-
-    # After quiz is complete, display final score        
-    print(f"\n\nQuiz complete! Your final score: {score} points!")
+            frame = Frame(clear_lines=30)
+            frame.print(f"\n\n{'='*45}")
+            frame.print(f"\nWhoops! That was wrong. Streak Reset! 🔥 {result['streak']}")
+            frame.print(f"The correct answer was: {result['correct_answer']}\n")
+            frame.print(f"CURRENT SCORE: {result['score']} points\n")
+            frame.print(f"{'='*45}")
+
+    summary = session.summary()
+
+    # After quiz is complete, display final score together with the result of the last answer
+    frame.print(f"\n\nQuiz complete! Your final score: {summary['score']} points!")
+    frame.show()
     
     # Prompt user to add score to leaderboard
-    add_to_leaderboard_prompt(score, highest_streak, len(questions), total_hints_used)
+    add_to_leaderboard_prompt(summary["score"], summary["highest_streak"], summary["questions"], summary["hints_used"],
+                              summary["correct_answers"], board)
     
     # Prompt if user wants to play again. If yes, go back to main menu. If no, exit program.
     while True:
         replay = input("Would you like to play again? (Y/N): ").strip().upper()
         if replay == "Y":
-            main_menu()
+            return MENU
             
         elif replay == "N":
             print("Goodbye! Thanks for playing!")
-            break
+            return EXIT
         
         else:
             print("\nInvalid Input. Please enter Y or N")
             continue
 
+
+# Game logic of one quiz, without any input() or print().
+# The terminal UI drives it, but it can run any number of games in one process, for example in tests or benchmarks.
+class QuizSession:
+    __slots__ = ("questions", "all_answers", "question_type", "index", "score", "streak", "highest_streak",
+                 "total_hints_used", "correct_answers", "hint_used", "option_labels", "answers")
+
+    def __init__(self, questions, all_answers, question_type):
+        self.questions = questions
+        self.all_answers = all_answers
+        self.question_type = question_type
+
+        # Tracker variables to keep track of updating values
+        self.index = 0
+        self.score = 0
+        self.streak = 0
+        self.highest_streak = 0
+        self.total_hints_used = 0
+        self.correct_answers = 0
+        self.load_question()
+
+    # Adds questions to the end of the quiz, for quizzes that arrive in batches
+    def add_questions(self, questions, all_answers):
+        was_finished = self.finished
+        self.questions = self.questions + list(questions)
+        self.all_answers = self.all_answers + list(all_answers)
+        if was_finished:
+            self.load_question()
+
+    # Sets up the options of the current question
+    def load_question(self):
+        # Hint used will stay false until the user uses a hint
+        self.hint_used = False
+        if self.finished:
+            return
+
+        # Changes the option labels depending on question type. The answers are copied since hints remove from them
+        if self.question_type == "boolean":
+            self.option_labels = ["A", "B"]
+            self.answers = ["True", "False"]
+        else:
+            self.option_labels = ["A", "B", "C", "D"][:len(self.all_answers[self.index][0])]
+            self.answers = list(self.all_answers[self.index][0])
+
+    @property
+    def finished(self):
+        return self.index >= len(self.questions)
+
+    # True if a hint can be used on the current question. Only for multiple choice questions, 1 hint per question
+    @property
+    def hint_available(self):
+        return self.question_type == "multiple" and not self.hint_used and not self.finished
+
+    # The current question number (starting at 1), question text, option labels and answers
+    def current(self):
+        return self.index + 1, self.questions[self.index], self.option_labels, self.answers
+
+    # Removes one wrong answer for 10 points. Returns True if an answer was removed
+    def hint(self):
+        if not self.hint_available:
+            return False
+        correct_answer = self.all_answers[self.index][1]
+        self.score, self.hint_used, self.option_labels, self.answers = apply_hint(self.answers, correct_answer, self.option_labels, self.score)
+        if self.hint_used:
+            # Leaderboard number of hints used tracker
+            self.total_hints_used += 1
+        return self.hint_used
+
+    # Answers the current question with an option label and moves on to the next question.
+    # Returns whether the answer was correct, the points added, the correct answer, and the streak and score after answering
+    def answer(self, label):
+        if self.finished:
+            raise ValueError("The quiz is already complete")
+        if label not in self.option_labels:
+            raise ValueError(f"Invalid option: {label}")
+
+        # Gets the index of the label, and matches the answer at that index to the correct answer.
+        correct_answer = self.all_answers[self.index][1]
+        correct = self.answers[self.option_labels.index(label)] == correct_answer
+        points = 0
+
+        # If correct, +1 to streak and add to score based off of current score multiplier. If wrong, reset streak
+        if correct:
+            self.streak += 1
+            self.correct_answers += 1
+            points = score_multiplier(self.streak)
+            self.score += points
+
+            # Keeps track of what was the highest streak that the user achieved.
+            self.highest_streak = max(self.highest_streak, self.streak)
+        else:
+            self.streak = 0
+
+        self.index += 1
+        self.load_question()
+        return {"correct": correct, "points": points, "correct_answer": correct_answer,
+                "streak": self.streak, "score": self.score}
+
+    # Final statistics of the quiz, as stored on the leaderboard
+    def summary(self):
+        return {"score": self.score, "highest_streak": self.highest_streak, "questions": len(self.questions),
+                "hints_used": self.total_hints_used, "correct_answers": self.correct_answers}
+
+
 # Prompts user to add their score to leaderboard
-def add_to_leaderboard_prompt(score, highest_streak, num_questions, total_hints_used):
+def add_to_leaderboard_prompt(score, highest_streak, num_questions, total_hints_used, correct_answers=None, board=None):
     
     while True:
         add_prompt = input("\nWould you like to add your score to the leaderboard? (Y/N): ").strip().upper()
         if add_prompt == 'Y':
             # If yes then prompt user for their name
             name = input("\nEnter your name: ").strip()
-            add_to_leaderboard(name, score, highest_streak, num_questions, total_hints_used)
-            display_leaderboard()
+            add_to_leaderboard(name, score, highest_streak, num_questions, total_hints_used, correct_answers, board)
+            display_leaderboard(board)
+
+            # Shows where the player's best score ranks on the whole leaderboard
+            rank = get_leaderboard(board).rank(name)
+            if rank is not None:
+                print(f"{name}, your best score is ranked #{rank}!")
+
+            # Compares the player's best score with every other player's best
+            percentile = get_leaderboard(board).percentile(name)
+            if percentile is not None:
+                print(f"You beat {percentile:.0f}% of players!")
+
+            stats = get_leaderboard(board).player_stats(name)
+            if stats is not None:
+                print(display_player_stats(stats))
             break
         elif add_prompt == "N":
             print("No entry added to the leaderboard.")
@@ -434,153 +853,2537 @@ def add_to_leaderboard_prompt(score, highest_streak, num_questions, total_hints_
             
 
 # Add to leaderboard function
-def add_to_leaderboard(name, score, highest_streak, num_questions, total_hints_used):
-    leaderboard = []
-    
-    # if file exists, open in read mode
-    # This section is for existing leaderboard entries
-    if os.path.exists(leaderboard_file):
-        with open(leaderboard_file, 'r') as file:
-
-            # The leaderboard file is structured with '=' on the top and bottom of the header, 
-            #   thus the next line after the first is the header
-            header = next(file)
-            
-            # Strip every line in the file except for the decoration '=' seperators.
-            for line in file:
-                line = line.strip()
-                if not line or line.startswith("="):
-                    continue
-                
-                # Split the line into parts, if there arent 5 parts, move onto the next line. It is probably the seperator line.
-                parts = line.split()
-                if len(parts) != 5:
-                    continue
-                try:
-                    # Assign each part that was split to a variable and catch the error to move on to another line
-                    player_name = parts[0]
-                    player_score = int(parts[1])
-                    player_streak = int(parts[2])
-                    questions_played = int(parts[3])
-                    player_total_hints_used = int(parts[4])
-
-                    # Append each line as one element(each line containing 5 parts) to the leaderboard list
-                    leaderboard.append((player_name.strip(), player_score, player_streak, questions_played, player_total_hints_used))
-                except ValueError:
-                    continue
+# Scores submitted at the same time are written together, see LeaderboardWriter
+# correct_answers is optional, it is only used for the player's accuracy.
+# board picks a leaderboard of its own, like a day's daily challenge, instead of the main leaderboard
+def add_to_leaderboard(name, score, highest_streak, num_questions, total_hints_used, correct_answers=None, board=None):
+    get_leaderboard_writer(board).submit((name.strip(), score, highest_streak, num_questions, total_hints_used, correct_answers))
 
-    # Append the current playing users statistics to the leaderboard list              
-    leaderboard.append((name.strip(), score, highest_streak, num_questions, total_hints_used))
 
-    # Sort the leaderboard list by the SCORE of each entry, and in descending order
-    leaderboard.sort(key=lambda leaderboard_entry: leaderboard_entry[1], reverse=True)
+# Formats a player's statistics from player_stats
+def display_player_stats(stats):
+    text = (f"\nGames played: {stats['games']}   Best score: {stats['best_score']}   "
+            f"Average score: {stats['average_score']:.1f}   Total score: {stats['total_score']}\n")
+    if stats["accuracy"] is not None:
+        text += f"Accuracy: {stats['accuracy']:.0%}   "
+    text += f"Hints per question: {stats['hint_rate']:.2f}\n"
+    return text
 
-    # Open the file in write mode, write the header, followed my the '=' seperator
-    # This will also create the file if it doesnt exist
-    with open(leaderboard_file, 'w') as file:
-        header = f"{'Name':<15} {'Score':<10} {'Highest Streak':<22} {'Questions Played':<20} {'Hints Used':<10}\n"
-        file.write(header)
-        file.write("=" * len(header) + "\n")
-        
-        # Loop to write each entry stored (current playing user and exisitng user) back to the leaderboard.txt file
-        # Writes each entry in one line, following the same spacing (Ex: ':<20') as the header to ensure correct formatting
-        for player_name, player_score, player_streak, questions_played, player_total_hints_used in leaderboard:
-            file.write(f"{player_name:<15} {player_score:<10} {player_streak:<22} {questions_played:<20} {player_total_hints_used:<10}\n")
-
-
-# Displays the content from the leaderboard file
-# If file does not exist then print 'no data...'
-def display_leaderboard():
-    print("\n\nLeaderboard:\n")
-    if os.path.exists(leaderboard_file):
-        with open(leaderboard_file, 'r') as file:
-            for line in file:
-                print(line, end="")
-        print()
+
+# Displays the top of the leaderboard in the fixed width leaderboard.txt format
+# If there are no entries then print 'no data...'
+def display_leaderboard(board=None):
+    print("\n\nLeaderboard:\n" if board is None else f"\n\nLeaderboard ({board}):\n")
+    entries = get_leaderboard(board).top(leaderboard_page_size)
+    if entries:
+        print(format_leaderboard(entries))
     else:
         print("\nNo leaderboard data available.\n")
-        
-# Hint system logic
-def apply_hint(answers, correct_answer, option_labels, score):
 
-    # Append passed-in wrong answers to a list
-    incorrect_answers = [ans for ans in answers if ans != correct_answer]
-    if incorrect_answers:
-        removed_answer = random.choice(incorrect_answers) # Randomly select one of the wrong answer
-        answers.remove(removed_answer) # Remove the randomly selected wrong answer
-        option_labels = option_labels[:len(answers)] # Shorten the option labels to only 3 options
-        print(f"Hint used! One wrong answer removed (cost: -10 points).")
-        score -= 10 # Cost of 1 hint
-        return score, True, option_labels, answers # Returns the updated score, option labels, answers and set 'hint used' to True
+
+# Lets the user page through the leaderboard and look up the rank of a player
+def browse_leaderboard():
+    offset = 0
+    while True:
+        entries = get_leaderboard().page(offset, leaderboard_page_size)
+        if not entries and offset == 0:
+            print("\nNo leaderboard data available.\n")
+            return
+
+        print(f"\n\nLeaderboard (ranks {offset + 1} - {offset + len(entries)}):\n")
+        print(format_leaderboard(entries))
+
+        # Reprompts the user until a valid option is entered
+        while True:
+            choice = input("Next page (N), Previous page (P), Find a player (F), or Back to Menu (B): ").strip().upper()
+            if choice == "N":
+                # Stays on the last page when there are no more entries after it
+                if len(entries) == leaderboard_page_size:
+                    offset += leaderboard_page_size
+                break
+            elif choice == "P":
+                offset = max(0, offset - leaderboard_page_size)
+                break
+            elif choice == "F":
+                name = input("Player name: ").strip()
+                rank = get_leaderboard().rank(name)
+                if rank is None:
+                    print(f"{name} is not on the leaderboard.")
+                else:
+                    print(f"{name}'s best score is ranked #{rank}.")
+            elif choice == "B":
+                return
+            else:
+                print("Invalid Input. Please enter N, P, F or B")
+
+
+# Returns the leaderboard backend picked with BRAINSTORM_LEADERBOARD, created on first use.
+# "sqlite" (the default) keeps scores in leaderboard.db, "text" keeps the old leaderboard.txt file.
+# With a board name, returns that board's leaderboard, kept in boards_dir as <board>.db or <board>.txt
+def get_leaderboard(board=None):
+    global leaderboard
+    with leaderboard_lock:
+        if board is not None:
+            if board not in board_leaderboards:
+                os.makedirs(boards_dir, exist_ok=True)
+                board_leaderboards[board] = create_leaderboard(os.path.join(boards_dir, f"{board}.db"),
+                                                               os.path.join(boards_dir, f"{board}.txt"))
+            return board_leaderboards[board]
+
+        if leaderboard is None:
+            leaderboard = create_leaderboard(leaderboard_db_file, leaderboard_file)
+    return leaderboard
+
+
+# Creates the leaderboard backend picked with BRAINSTORM_LEADERBOARD for the given files
+def create_leaderboard(db_file, text_file):
+    backend = os.environ.get("BRAINSTORM_LEADERBOARD", "sqlite").lower()
+    if backend == "text":
+        return TextLeaderboard(text_file)
+    elif backend == "sqlite":
+        return SQLiteLeaderboard(db_file, text_file)
     else:
-        print("No incorrect answers available to remove.")
-        return score, False, option_labels, answers
-    
+        raise ValueError(f"Unknown leaderboard backend: {backend}")
 
-# Retrieve questions from API       
-def get_questions(url):
-    questions = []
-    for i in range(len(url["results"])):
-        questions.append(text_cleanup(url["results"][i]["question"]))
-        i += 1
+
+# Returns the writer that batches scores for the leaderboard backend, or for a board's leaderboard
+def get_leaderboard_writer(board=None):
+    global leaderboard_writer
+    backend = get_leaderboard(board)
+    with leaderboard_lock:
+        if board is not None:
+            if board not in board_writers or board_writers[board].backend is not backend:
+                board_writers[board] = LeaderboardWriter(backend)
+            return board_writers[board]
+
+        if leaderboard_writer is None or leaderboard_writer.backend is not backend:
+            leaderboard_writer = LeaderboardWriter(backend)
+    return leaderboard_writer
+
+
+# Group commit for leaderboard scores.
+# The first thread to submit a score writes it, and every score submitted while that write is going on
+#   is written by the same thread in the next batch, with one rewrite or one transaction per batch.
+# submit only returns once its score is stored, so the score shows up in a leaderboard displayed right after.
+class LeaderboardWriter:
+    def __init__(self, backend):
+        self.backend = backend
+        self.lock = threading.Lock()
+        self.pending = []
+        self.writing = False
+
+    def submit(self, entry):
+        done = threading.Event()
+        result = {"error": None}
+        with self.lock:
+            self.pending.append((entry, done, result))
+            leader = not self.writing
+            self.writing = True
+
+        if leader:
+            self.write_batches()
+        done.wait()
+        if result["error"] is not None:
+            raise result["error"]
+
+    # Writes batches until no scores are waiting
+    def write_batches(self):
+        batch = []
+        try:
+            while True:
+                with self.lock:
+                    batch, self.pending = self.pending, []
+                    if not batch:
+                        self.writing = False
+                        return
+                try:
+                    self.backend.add_many([entry for entry, _, _ in batch])
+                    error = None
+                except Exception as exception:
+                    error = exception
+                self.finish(batch, error)
+                batch = []
+        except BaseException as interrupt:
+            # Interrupted, for example by Ctrl+C: hand the writing back and release every waiting score,
+            #   so no later submit waits forever on a writer that is gone
+            with self.lock:
+                batch, self.pending = batch + self.pending, []
+                self.writing = False
+            self.finish(batch, interrupt)
+            raise
+
+    # Wakes up the submitters of a batch, with the error the batch failed with if any
+    def finish(self, batch, error):
+        for _, done, result in batch:
+            result["error"] = error
+            done.set()
+
+
+# Order statistic index over scores, a Fenwick (binary indexed) tree counting how many players have each score.
+# Adding a score and counting the scores below one both take O(log n) in the range of possible scores.
+# Scores outside the range are counted at its edges.
+class ScoreIndex:
+    def __init__(self, lowest, highest):
+        self.lowest = lowest
+        self.size = highest - lowest + 1
+        self.tree = [0] * (self.size + 1)
+        self.total = 0
+
+    # Position of a score in the tree, starting at 1
+    def position(self, score):
+        return min(max(score, self.lowest), self.lowest + self.size - 1) - self.lowest + 1
+
+    def add(self, score, count=1):
+        self.total += count
+        position = self.position(score)
+        while position <= self.size:
+            self.tree[position] += count
+            position += position & -position
+
+    # Number of scores lower than score
+    def count_below(self, score):
+        count = 0
+        position = self.position(score) - 1
+        while position > 0:
+            count += self.tree[position]
+            position -= position & -position
+        return count
+
+
+# Holds an exclusive lock on path + ".lock" for as long as the with block runs.
+# The lock is shared by every process on the machine, so game processes take turns rewriting the file
+@contextlib.contextmanager
+def locked_file(path):
+    with open(path + ".lock", "a+") as lock_file:
+        if os.name == "nt":
+            import msvcrt
+            while True:
+                try:
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    # LK_LOCK gives up after 10 seconds, keep waiting
+                    continue
+        else:
+            import fcntl
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if os.name == "nt":
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+# Opens a temporary file for writing path, and swaps it in for path once the with block is done,
+#   so a crash halfway through never leaves a broken file behind.
+# The temporary file is unique to the process and thread, so writers running at the same time never share one
+@contextlib.contextmanager
+def atomic_write(path, mode="w"):
+    temp_file = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(temp_file, mode) as file:
+            yield file
+        os.replace(temp_file, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(temp_file)
+        raise
+
+
+# Reads the entries of a leaderboard.txt file as (name, score, highest streak, questions played, hints used) tuples
+def parse_leaderboard_file(path):
+    return list(iter_leaderboard_file(path))
+
+
+# Yields the entries of a leaderboard.txt file one line at a time, so callers can stop reading early
+def iter_leaderboard_file(path):
+    if not os.path.exists(path):
+        return
+
+    with open(path, 'r') as file:
+
+        # The leaderboard file is structured with '=' on the top and bottom of the header, 
+        #   thus the next line after the first is the header
+        header = next(file, None)
         
-    return questions
+        # Strip every line in the file except for the decoration '=' seperators.
+        for line in file:
+            line = line.strip()
+            if not line or line.startswith("="):
+                continue
+            
+            # Split the line into parts, if there arent 5 parts, move onto the next line. It is probably the seperator line.
+            parts = line.split()
+            if len(parts) != 5:
+                continue
+            try:
+                # Assign each part that was split to a variable and catch the error to move on to another line
+                player_name = parts[0]
+                player_score = int(parts[1])
+                player_streak = int(parts[2])
+                questions_played = int(parts[3])
+                player_total_hints_used = int(parts[4])
 
+                # Each line is one entry containing 5 parts
+                entry = (player_name.strip(), player_score, player_streak, questions_played, player_total_hints_used)
+            except ValueError:
+                continue
+            yield entry
 
-# Retrieve corresponding answers from API, keeps track of correct answer and wrong answers
-def get_answers(url):
-    all_answers = []
-    for i in range(len(url["results"])):
-        correct_answer = text_cleanup(url["results"][i]["correct_answer"])
-        incorrect_answers = [text_cleanup(ans) for ans in url["results"][i]["incorrect_answers"]]
-        answers = [correct_answer] + incorrect_answers
-        random.shuffle(answers)
-        all_answers.append([answers, correct_answer])
-    
-    return all_answers
 
+# Formats leaderboard entries as the fixed width text of leaderboard.txt
+def format_leaderboard(entries):
+    header = f"{'Name':<15} {'Score':<10} {'Highest Streak':<22} {'Questions Played':<20} {'Hints Used':<10}\n"
+    lines = [header, "=" * len(header) + "\n"]
 
-# Score multiplier system.
-# Points per question scale with current streak of the player
-def score_multiplier(current_streak):
-    if 0 <= current_streak <= 2:
-        return 10
-    elif 3 <= current_streak <= 5:
-        return 12
-    elif 6 <= current_streak <= 8:
-        return 15
-    elif 9 <= current_streak <= 11:
-        return 20
-    elif current_streak >= 12:
-        return 30
+    # Each entry in one line, following the same spacing (Ex: ':<20') as the header to ensure correct formatting
+    for player_name, player_score, player_streak, questions_played, player_total_hints_used in entries:
+        lines.append(f"{player_name:<15} {player_score:<10} {player_streak:<22} {questions_played:<20} {player_total_hints_used:<10}\n")
+    return "".join(lines)
 
 
-# Simple text cleanup function
-def text_cleanup(text):
-    text = (html.unescape(text)).replace("\\'", "'")
-    return text
+# Writes leaderboard entries to a file in the leaderboard.txt format.
+# The file is written next to the target first and then swapped in, so a crash never leaves half a leaderboard
+def export_leaderboard(path, entries=None):
+    if entries is None:
+        entries = get_leaderboard().entries()
+    with atomic_write(path) as file:
+        file.write(format_leaderboard(entries))
 
-# Displays total currently available number of question from specified category
-def question_count(category_id):
-    category_dict = {"9":"General Knowledge", "10":"Books", "11":"Film", "12":"Music", "13": "Musicals & Theatres",
-                     "14":"Television", "15":"Video Games", "16":"Board Games", "17":"Science & Nature",
-                     "18":"Computers", "19":"Mathematics", "20":"Mythology", "21":"Sports",
-                     "22":"Geography", "23":"History", "24":"Politics", "25":"Art", "26":"Celebrities",
-                     "27":"Animals", "28":"Vehicles", "29":"Comics", "30":"Gadgets", 
-                     "31":"Japanese Anime & Manga", "32":"Cartoon & Animations"}
-    url = f"https://opentdb.com/api_count.php?category={category_id}"
-    questions = requests.get(url).json()
 
-    # Retrieves the total no. of questions, along with questions per difficulty, and prints
-    total_category_questions = questions["category_question_count"]["total_question_count"]
-    total_easy = questions["category_question_count"]["total_easy_question_count"]
-    total_medium = questions["category_question_count"]["total_medium_question_count"]
-    total_hard = questions["category_question_count"]["total_hard_question_count"]
-    return f"\nTime To Do A Quiz About {category_dict.get(category_id)}!\nTotal Questions About This Category: {total_category_questions}\nTotal Easy Questions: {total_easy}\nTotal Medium Questions: {total_medium}\nTotal Hard Questions: {total_hard}\n"
- 
+# The original leaderboard storage: the whole leaderboard.txt file is read, sorted and rewritten for every batch of scores.
+# The read and rewrite happen under a file lock, so processes sharing the file never overwrite each other's scores
+class TextLeaderboard:
+    def __init__(self, path):
+        self.path = path
 
-if __name__ == "__main__":
-    main_menu()
+    # Files that change whenever a score is added
+    def files(self):
+        return [self.path]
+
+    # Adds entries and rewrites the file once, sorted by SCORE, in descending order.
+    # The file has no column for correct answers, so only the first 5 fields are kept
+    def add_many(self, new_entries):
+        with locked_file(self.path):
+            entries = parse_leaderboard_file(self.path)
+            entries.extend(tuple(entry[:5]) for entry in new_entries)
+            entries.sort(key=lambda leaderboard_entry: leaderboard_entry[1], reverse=True)
+            export_leaderboard(self.path, entries)
+
+    # All entries, highest score first
+    def entries(self):
+        return parse_leaderboard_file(self.path)
+
+    # The file is kept sorted, so the top entries and pages only read the lines up to the page
+    def top(self, n):
+        return self.page(0, n)
+
+    def page(self, offset, limit):
+        entries = []
+        for position, entry in enumerate(iter_leaderboard_file(self.path)):
+            if position >= offset + limit:
+                break
+            if position >= offset:
+                entries.append(entry)
+        return entries
+
+    # The first entry of a player is their best. Its rank is one more than the number of higher scores,
+    #   so tied scores share a rank. None if the player has no entry
+    def rank(self, name):
+        rank = 0
+        previous_score = None
+        for position, entry in enumerate(iter_leaderboard_file(self.path)):
+            if entry[1] != previous_score:
+                rank = position + 1
+                previous_score = entry[1]
+            if entry[0] == name:
+                return rank
+        return None
+
+    # The text file has no aggregates, so statistics and percentiles read the whole file
+    def player_stats(self, name):
+        games = [entry for entry in iter_leaderboard_file(self.path) if entry[0] == name]
+        if not games:
+            return None
+        total_score = sum(entry[1] for entry in games)
+        questions = sum(entry[3] for entry in games)
+        return {"games": len(games), "best_score": games[0][1], "total_score": total_score,
+                "average_score": total_score / len(games), "accuracy": None,
+                "hint_rate": sum(entry[4] for entry in games) / questions if questions else 0.0}
+
+    def percentile(self, name):
+        best_scores = {}
+        for entry in iter_leaderboard_file(self.path):
+            best_scores.setdefault(entry[0], entry[1])
+        if name not in best_scores or len(best_scores) < 2:
+            return None
+        below = sum(1 for score in best_scores.values() if score < best_scores[name])
+        return 100 * below / (len(best_scores) - 1)
+
+
+# Leaderboard stored in SQLite with an index on score.
+# Inserting a score only updates the table and its index, O(log n), instead of rewriting every entry.
+# An existing leaderboard.txt is imported the first time the database is created.
+# The database runs in WAL mode, so game processes sharing it can read while another one writes,
+#   and writers wait for each other (busy_timeout) instead of failing.
+class SQLiteLeaderboard:
+    def __init__(self, path, import_from=None):
+        self.path = path
+        self.lock = threading.Lock()
+
+        # Autocommit mode, transactions are started explicitly by self.transaction()
+        self.connection = sqlite3.connect(path, check_same_thread=False, timeout=30, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        with self.transaction():
+            self.connection.execute("""CREATE TABLE IF NOT EXISTS scores (
+                                           id INTEGER PRIMARY KEY AUTOINCREMENT,
+                                           name TEXT NOT NULL,
+                                           score INTEGER NOT NULL,
+                                           highest_streak INTEGER NOT NULL,
+                                           questions_played INTEGER NOT NULL,
+                                           hints_used INTEGER NOT NULL)""")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS scores_by_score ON scores (score DESC, id)")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS scores_by_name ON scores (name, score)")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+            # Per player aggregates, kept up to date on every insert
+            self.connection.execute("""CREATE TABLE IF NOT EXISTS players (
+                                           name TEXT PRIMARY KEY,
+                                           games INTEGER NOT NULL,
+                                           best_score INTEGER NOT NULL,
+                                           total_score INTEGER NOT NULL,
+                                           questions_played INTEGER NOT NULL,
+                                           hints_used INTEGER NOT NULL,
+                                           correct_answers INTEGER NOT NULL,
+                                           tracked_questions INTEGER NOT NULL)""")
+
+            # How many players have each best score. The percentile index is built from this,
+            #   so it never has to read the scores table
+            self.connection.execute("CREATE TABLE IF NOT EXISTS best_scores (score INTEGER PRIMARY KEY, players INTEGER NOT NULL)")
+
+            # How many entries have each score, for the rank index
+            self.connection.execute("CREATE TABLE IF NOT EXISTS score_counts (score INTEGER PRIMARY KEY, entries INTEGER NOT NULL)")
+
+            # Databases from before correct answers were stored get the column added
+            columns = [row[1] for row in self.connection.execute("PRAGMA table_info(scores)")]
+            if "correct_answers" not in columns:
+                self.connection.execute("ALTER TABLE scores ADD COLUMN correct_answers INTEGER")
+        self.migrate(import_from)
+        self.migrate_players()
+        self.migrate_score_counts()
+
+        # Order statistic index of every player's best score, built on first use
+        self.score_index = None
+        self.score_index_version = None
+
+        # Order statistic index of every entry's score, built on first use
+        self.entry_index = None
+        self.entry_index_version = None
+
+    # Runs the with block as one write transaction. BEGIN IMMEDIATE takes the write lock up front,
+    #   so two processes can't both read and then fail to upgrade to writing
+    @contextlib.contextmanager
+    def transaction(self):
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+        self.connection.execute("COMMIT")
+
+    # Imports the entries of an old leaderboard.txt file once. The text file itself is left untouched
+    def migrate(self, path):
+        with self.lock, self.transaction():
+            if self.connection.execute("SELECT 1 FROM meta WHERE key = 'migrated'").fetchone():
+                return
+            entries = parse_leaderboard_file(path) if path else []
+
+            # Rows are inserted in file order, so ties keep the order they had in the file
+            self.connection.executemany("""INSERT INTO scores (name, score, highest_streak, questions_played, hints_used)
+                                           VALUES (?, ?, ?, ?, ?)""", entries)
+            self.connection.execute("INSERT INTO meta (key, value) VALUES ('migrated', ?)", (str(len(entries)),))
+
+    # Builds the player aggregates from every score once, for databases from before the players table existed
+    def migrate_players(self):
+        with self.lock, self.transaction():
+            if self.connection.execute("SELECT 1 FROM meta WHERE key = 'players_built'").fetchone():
+                return
+            self.connection.execute("DELETE FROM players")
+            self.connection.execute("""INSERT INTO players
+                                       SELECT name, COUNT(*), MAX(score), SUM(score), SUM(questions_played), SUM(hints_used),
+                                              0, 0
+                                       FROM scores GROUP BY name""")
+            self.connection.execute("DELETE FROM best_scores")
+            self.connection.execute("""INSERT INTO best_scores
+                                       SELECT best_score, COUNT(*) FROM players GROUP BY best_score""")
+            self.connection.execute("INSERT INTO meta (key, value) VALUES ('players_built', '1')")
+
+    # Counts the entries per score once, for databases from before the score_counts table existed
+    def migrate_score_counts(self):
+        with self.lock, self.transaction():
+            if self.connection.execute("SELECT 1 FROM meta WHERE key = 'score_counts_built'").fetchone():
+                return
+            self.connection.execute("DELETE FROM score_counts")
+            self.connection.execute("INSERT INTO score_counts SELECT score, COUNT(*) FROM scores GROUP BY score")
+            self.connection.execute("INSERT INTO meta (key, value) VALUES ('score_counts_built', '1')")
+
+    # Adds entries in one transaction, one commit for the whole batch.
+    # Each entry also updates the entry count of its score, the player's aggregates and,
+    #   when their best score goes up, the best score counts
+    def add_many(self, entries):
+        with self.lock, self.transaction():
+            version = self.version()
+            changes = []
+            for entry in entries:
+                name, score, highest_streak, num_questions, total_hints_used = entry[:5]
+                correct_answers = entry[5] if len(entry) > 5 else None
+
+                self.connection.execute("""INSERT INTO scores (name, score, highest_streak, questions_played, hints_used, correct_answers)
+                                           VALUES (?, ?, ?, ?, ?, ?)""",
+                                        (name, score, highest_streak, num_questions, total_hints_used, correct_answers))
+                self.connection.execute("""INSERT INTO score_counts VALUES (?, 1)
+                                           ON CONFLICT (score) DO UPDATE SET entries = entries + 1""", (score,))
+
+                previous = self.connection.execute("SELECT best_score FROM players WHERE name = ?", (name,)).fetchone()
+                self.connection.execute("""INSERT INTO players VALUES (?, 1, ?, ?, ?, ?, ?, ?)
+                                           ON CONFLICT (name) DO UPDATE SET
+                                               games = games + 1,
+                                               best_score = MAX(best_score, excluded.best_score),
+                                               total_score = total_score + excluded.total_score,
+                                               questions_played = questions_played + excluded.questions_played,
+                                               hints_used = hints_used + excluded.hints_used,
+                                               correct_answers = correct_answers + excluded.correct_answers,
+                                               tracked_questions = tracked_questions + excluded.tracked_questions""",
+                                        (name, score, score, num_questions, total_hints_used, correct_answers or 0,
+                                         num_questions if correct_answers is not None else 0))
+
+                if previous is None or score > previous[0]:
+                    if previous is not None:
+                        self.count_best_score(previous[0], -1)
+                        changes.append((previous[0], -1))
+                    self.count_best_score(score, 1)
+                    changes.append((score, 1))
+
+            self.connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('version', ?)", (str(version + 1),))
+
+            # Keep the indexes in memory in step, unless another process wrote since they were built
+            if self.score_index is not None and self.score_index_version == version:
+                for score, count in changes:
+                    self.score_index.add(score, count)
+                self.score_index_version = version + 1
+            if self.entry_index is not None and self.entry_index_version == version:
+                for entry in entries:
+                    self.entry_index.add(entry[1])
+                self.entry_index_version = version + 1
+
+    # Changes the number of players whose best score is score
+    def count_best_score(self, score, count):
+        self.connection.execute("""INSERT INTO best_scores VALUES (?, ?)
+                                   ON CONFLICT (score) DO UPDATE SET players = players + excluded.players""", (score, count))
+        self.connection.execute("DELETE FROM best_scores WHERE score = ? AND players <= 0", (score,))
+
+    # Number of write batches so far, shared by every process using the database
+    def version(self):
+        row = self.connection.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        return int(row[0]) if row else 0
+
+    # Files that change whenever a score is added. In WAL mode new scores land in the -wal file
+    #   until a checkpoint copies them into the database
+    def files(self):
+        return [self.path, self.path + "-wal"]
+
+    # Aggregated statistics of a player, None if the player has no entry.
+    # Accuracy only counts games where the number of correct answers was stored, None if there are none
+    def player_stats(self, name):
+        with self.lock:
+            row = self.connection.execute("SELECT * FROM players WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            return None
+        _, games, best_score, total_score, questions_played, hints_used, correct_answers, tracked_questions = row
+        return {"games": games, "best_score": best_score, "total_score": total_score,
+                "average_score": total_score / games,
+                "accuracy": correct_answers / tracked_questions if tracked_questions else None,
+                "hint_rate": hints_used / questions_played if questions_played else 0.0}
+
+    # Percentage of the other players whose best score is lower than this player's best, None if there is
+    #   nobody to compare with. Answered from the order statistic index in O(log n)
+    def percentile(self, name):
+        with self.lock:
+            row = self.connection.execute("SELECT best_score FROM players WHERE name = ?", (name,)).fetchone()
+            if row is None:
+                return None
+            index = self.load_score_index()
+        if index.total < 2:
+            return None
+        return 100 * index.count_below(row[0]) / (index.total - 1)
+
+    # Returns the score index, rebuilding it from best_scores if the database changed since it was built
+    def load_score_index(self):
+        version = self.version()
+        if self.score_index is None or self.score_index_version != version:
+            index = ScoreIndex(-10 * max_quiz_questions, 30 * max_quiz_questions)
+            for score, players in self.connection.execute("SELECT score, players FROM best_scores"):
+                index.add(score, players)
+            self.score_index = index
+            self.score_index_version = version
+        return self.score_index
+
+    # Returns the entry index, rebuilding it from score_counts if the database changed since it was built
+    def load_entry_index(self):
+        version = self.version()
+        if self.entry_index is None or self.entry_index_version != version:
+            index = ScoreIndex(-10 * max_quiz_questions, 30 * max_quiz_questions)
+            for score, entries in self.connection.execute("SELECT score, entries FROM score_counts"):
+                index.add(score, entries)
+            self.entry_index = index
+            self.entry_index_version = version
+        return self.entry_index
+
+    # All entries, highest score first. Ties keep the order the scores were added in, like the text file
+    def entries(self):
+        with self.lock:
+            return self.connection.execute("""SELECT name, score, highest_streak, questions_played, hints_used
+                                              FROM scores ORDER BY score DESC, id""").fetchall()
+
+    # The top n entries, read straight from the score index
+    def top(self, n):
+        return self.page(0, n)
+
+    # One page of entries, walking the score index from the offset
+    def page(self, offset, limit):
+        with self.lock:
+            return self.connection.execute("""SELECT name, score, highest_streak, questions_played, hints_used
+                                              FROM scores ORDER BY score DESC, id LIMIT ? OFFSET ?""", (limit, offset)).fetchall()
+
+    # Rank of a player's best score, None if the player has no entry.
+    # The best score comes from the players table and the entries above it are counted by the entry index,
+    #   so a lookup takes O(log n) however far down the leaderboard the player is
+    def rank(self, name):
+        with self.lock:
+            row = self.connection.execute("SELECT best_score FROM players WHERE name = ?", (name,)).fetchone()
+            if row is None:
+                return None
+            index = self.load_entry_index()
+        return index.total - index.count_below(row[0] + 1) + 1
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+
+# One screen of output. Everything printed to a frame is collected in a buffer and written with a single write,
+#   instead of many small prints per screen.
+# A frame with clear_lines clears the screen first: with ANSI cursor control when the terminal supports it,
+#   otherwise by printing that many blank lines like before
+class Frame:
+    def __init__(self, clear_lines=0):
+        self.parts = []
+        if clear_lines:
+            self.parts.append(ANSI_CLEAR if ansi_supported() else "\n" * clear_lines + "\n")
+
+    # Adds text to the frame the same way print would
+    def print(self, *values, sep=" ", end="\n"):
+        self.parts.append(sep.join(str(value) for value in values) + end)
+
+    # Writes the whole frame at once
+    def show(self):
+        sys.stdout.write("".join(self.parts))
+        sys.stdout.flush()
+        self.parts = []
+
+
+# Moves the cursor to the top left and clears the screen
+ANSI_CLEAR = "\033[H\033[2J"
+
+
+# True if stdout is a terminal that understands ANSI cursor control. Checked once, the terminal doesn't change
+@functools.lru_cache(maxsize=None)
+def ansi_supported():
+    if os.environ.get("BRAINSTORM_PLAIN") or not sys.stdout.isatty():
+        return False
+    if os.environ.get("TERM", "") in ("", "dumb"):
+        # Windows terminals usually don't set TERM, Windows Terminal and ANSICON do understand ANSI
+        return os.name == "nt" and ("WT_SESSION" in os.environ or "ANSICON" in os.environ)
+    return True
+
+
+# Renders a stylized title with figlet. Titles never change, so each one is only rendered once
+#   and kept in the render cache, which skips loading the font at all once the cache is on disk
+def render_banner(text):
+    global figlet
+    key = f"banner|slant|{text}"
+    rendered = cached_render(key)
+    if rendered is None:
+        with render_cache_lock:
+            if figlet is None:
+                # Setfont for figlet. "slant" is the name of the font
+                figlet = pyfiglet.Figlet()
+                figlet.setFont(font = "slant")
+        rendered = figlet.renderText(text)
+        store_render(key, rendered)
+    return rendered
+
+
+# Renders a table with tabulate. Menus and other static tables are cached by their content,
+#   tables that change every time (like answer options) should pass cache=False
+def render_table(rows, cache=True, **options):
+    if not cache:
+        return tabulate_module.tabulate(rows, **options)
+
+    key = "table|" + json.dumps([rows, options], sort_keys=True)
+    rendered = cached_render(key)
+    if rendered is None:
+        rendered = tabulate_module.tabulate(rows, **options)
+        store_render(key, rendered)
+    return rendered
+
+
+# Returns a cached rendering, or None if it has not been rendered yet
+def cached_render(key):
+    return load_render_cache().get(key)
+
+
+# Adds a rendering to the cache, and writes the cache to disk when it is persisted
+def store_render(key, rendered):
+    cache = load_render_cache()
+    with render_cache_lock:
+        cache[key] = rendered
+        if not render_cache_persisted:
+            return
+        try:
+            with atomic_write(render_cache_file) as file:
+                json.dump({"version": render_cache_version, "renders": cache}, file)
+        except OSError:
+            # A read-only install just renders again next time
+            pass
+
+
+# Loads the render cache from disk once, later calls reuse the copy in memory
+def load_render_cache():
+    global render_cache
+    with render_cache_lock:
+        if render_cache is None:
+            render_cache = {}
+            if render_cache_persisted:
+                try:
+                    with open(render_cache_file, "r") as file:
+                        data = json.load(file)
+                    if data.get("version") == render_cache_version:
+                        render_cache = data["renders"]
+                except (OSError, ValueError, AttributeError, KeyError):
+                    pass
+    return render_cache
+
+
+# Hint system logic
+def apply_hint(answers, correct_answer, option_labels, score):
+
+    # Append passed-in wrong answers to a list
+    incorrect_answers = [ans for ans in answers if ans != correct_answer]
+    if incorrect_answers:
+        removed_answer = random.choice(incorrect_answers) # Randomly select one of the wrong answer
+        answers.remove(removed_answer) # Remove the randomly selected wrong answer
+        option_labels = option_labels[:len(answers)] # Shorten the option labels to only 3 options
+        score -= 10 # Cost of 1 hint
+        return score, True, option_labels, answers # Returns the updated score, option labels, answers and set 'hint used' to True
+    else:
+        return score, False, option_labels, answers
+    
+
+# Retrieve questions from API       
+def get_questions(url):
+    questions = []
+    for i in range(len(url["results"])):
+        questions.append(text_cleanup(url["results"][i]["question"]))
+        i += 1
+        
+    return questions
+
+
+# Retrieve corresponding answers from API, keeps track of correct answer and wrong answers
+def get_answers(url):
+    all_answers = []
+    for i in range(len(url["results"])):
+        correct_answer = text_cleanup(url["results"][i]["correct_answer"])
+        incorrect_answers = [text_cleanup(ans) for ans in url["results"][i]["incorrect_answers"]]
+        answers = [correct_answer] + incorrect_answers
+        random.shuffle(answers)
+        all_answers.append([answers, correct_answer])
+    
+    return all_answers
+
+
+# Score multiplier system.
+# Points per question scale with current streak of the player
+def score_multiplier(current_streak):
+    if 0 <= current_streak <= 2:
+        return 10
+    elif 3 <= current_streak <= 5:
+        return 12
+    elif 6 <= current_streak <= 8:
+        return 15
+    elif 9 <= current_streak <= 11:
+        return 20
+    elif current_streak >= 12:
+        return 30
+
+
+# Simple text cleanup function
+def text_cleanup(text):
+    text = (html.unescape(text)).replace("\\'", "'")
+    return text
+
+# Displays total currently available number of question from specified category.
+# Counts come from the question count cache, so picking a category usually skips the network.
+def question_count(category_id):
+    counts = get_question_counts(category_id)
+    if counts is None:
+        return f"\nTime To Do A Quiz About {get_category_registry().name(category_id)}!\n(Question counts are unavailable right now)\n"
+
+    # Retrieves the total no. of questions, along with questions per difficulty, and prints
+    text = f"\nTime To Do A Quiz About {get_category_registry().name(category_id)}!\nTotal Questions About This Category: {counts['total']}\n"
+
+    # Counts warmed from api_count_global.php only have the total until the full counts are fetched
+    if counts["easy"] is not None:
+        text += f"Total Easy Questions: {counts['easy']}\nTotal Medium Questions: {counts['medium']}\nTotal Hard Questions: {counts['hard']}\n"
+    return text
+
+
+# Returns the cached counts for a category if they are younger than the TTL, otherwise None
+def cached_question_counts(category_id):
+    cache = load_count_cache()
+    with count_cache_lock:
+        counts = cache.get(category_id)
+        if counts is None or time.time() - counts["time"] > count_cache_ttl:
+            return None
+
+        # Mark the entry as recently used so eviction drops the least recently used categories first
+        cache.move_to_end(category_id)
+        return counts
+
+
+# Stores counts for a category, evicting the least recently used entries once the cache is full
+def store_question_counts(category_id, counts):
+    cache = load_count_cache()
+    with count_cache_lock:
+        cache[category_id] = counts
+        cache.move_to_end(category_id)
+        while len(cache) > count_cache_size:
+            cache.popitem(last=False)
+    save_count_cache()
+
+
+# Fetches the total and per difficulty counts of a category from api_count.php and caches them
+def fetch_question_counts(category_id):
+    questions = api_get("api_count.php", {"category": category_id})
+    counts = {"time": time.time(),
+              "total": questions["category_question_count"]["total_question_count"],
+              "easy": questions["category_question_count"]["total_easy_question_count"],
+              "medium": questions["category_question_count"]["total_medium_question_count"],
+              "hard": questions["category_question_count"]["total_hard_question_count"]}
+    store_question_counts(category_id, counts)
+    return counts
+
+
+# Returns the counts for a category, from the cache when possible.
+# Partial counts from the warm up are shown right away while the full counts are fetched in the background.
+# Returns None if the counts can't be fetched.
+def get_question_counts(category_id):
+    counts = cached_question_counts(category_id)
+    if counts is not None:
+        if counts["easy"] is None and not offline_mode:
+            start_background_thread(fetch_question_counts_quietly, category_id)
+        return counts
+
+    if offline_mode:
+        return None
+    try:
+        return fetch_question_counts(category_id)
+    except (requests.RequestException, TriviaAPIError):
+        return None
+
+
+# Background version of fetch_question_counts, a failure just leaves the cache as it is
+def fetch_question_counts_quietly(category_id):
+    try:
+        fetch_question_counts(category_id)
+    except (requests.RequestException, TriviaAPIError):
+        pass
+
+
+# Fills the cache with the total question count of every category from one api_count_global.php request.
+# Categories that already have fresh full counts are left alone.
+def warm_question_counts():
+    try:
+        data = api_get("api_count_global.php")
+    except (requests.RequestException, TriviaAPIError):
+        return
+
+    now = time.time()
+    cache = load_count_cache()
+    with count_cache_lock:
+        for category_id, category_counts in data.get("categories", {}).items():
+            counts = cache.get(category_id)
+            if counts is not None and counts["easy"] is not None and now - counts["time"] <= count_cache_ttl:
+                continue
+            cache[category_id] = {"time": now, "total": category_counts["total_num_of_verified_questions"],
+                                  "easy": None, "medium": None, "hard": None}
+        while len(cache) > count_cache_size:
+            cache.popitem(last=False)
+    save_count_cache()
+
+
+# Loads the question count cache from disk once, later calls reuse the copy in memory
+def load_count_cache():
+    global count_cache
+    with count_cache_lock:
+        if count_cache is None:
+            try:
+                with open(count_cache_file, "r") as file:
+                    count_cache = OrderedDict(json.load(file))
+            except (OSError, ValueError):
+                count_cache = OrderedDict()
+    return count_cache
+
+
+# Writes the question count cache to disk, swapping in a temporary file like the question bank does
+def save_count_cache():
+    cache = load_count_cache()
+    with count_cache_lock:
+        with atomic_write(count_cache_file) as file:
+            json.dump(cache, file)
+
+
+# Returns the category registry. It is built once per run: from categories.json when it is there,
+#   otherwise from api_category.php, and from the built-in categories if neither is available.
+# A categories.json older than category_refresh_age is used right away and refreshed in the background.
+def get_category_registry():
+    global category_registry
+    with category_registry_lock:
+        if category_registry is not None:
+            return category_registry
+
+        categories, fetched_at = load_categories_file()
+        if categories is None and not offline_mode:
+            try:
+                categories = fetch_categories()
+            except (requests.RequestException, TriviaAPIError, KeyError, TypeError):
+                categories = None
+        elif categories is not None and time.time() - fetched_at > category_refresh_age and not offline_mode:
+            start_background_thread(refresh_categories)
+
+        category_registry = CategoryRegistry(categories or builtin_categories)
+        return category_registry
+
+
+# Reads categories.json. Returns the categories and the time they were fetched, or (None, 0) if there is no usable file
+def load_categories_file():
+    try:
+        with open(categories_file, "r") as file:
+            data = json.load(file)
+        return [(str(category_id), name) for category_id, name in data["categories"]], data["time"]
+    except (OSError, ValueError, KeyError, TypeError):
+        return None, 0
+
+
+# Fetches every category from api_category.php and saves them to categories.json when it can
+def fetch_categories():
+    data = api_get("api_category.php")
+    categories = [(str(category["id"]), category["name"]) for category in data["trivia_categories"]]
+    try:
+        with atomic_write(categories_file) as file:
+            json.dump({"time": time.time(), "categories": categories}, file)
+    except OSError:
+        # A read-only install still gets the categories, they are just fetched again next time
+        pass
+    return categories
+
+
+# Background refresh of categories.json. The new categories replace the registry for the next menu shown
+def refresh_categories():
+    global category_registry
+    try:
+        categories = fetch_categories()
+    except (requests.RequestException, TriviaAPIError, KeyError, TypeError):
+        return
+    with category_registry_lock:
+        category_registry = CategoryRegistry(categories)
+
+
+# Every category with O(1) lookups between IDs and names, and the category menus built once.
+# Categories named "Group: Name" are put in a submenu for their group (marked with '+' in the top level menu).
+# Menus are sorted by name, followed by All Categories and One Random Category.
+class CategoryRegistry:
+    def __init__(self, categories):
+        self.names = {}
+        self.full_names = {}
+        self.ids_by_name = {}
+        self.groups = {}
+        top_level = []
+
+        for category_id, full_name in categories:
+            group, _, name = full_name.rpartition(": ")
+            self.names[category_id] = name
+            self.full_names[category_id] = full_name
+            self.ids_by_name[full_name.lower()] = category_id
+            self.ids_by_name.setdefault(name.lower(), category_id)
+            if group:
+                if group not in self.groups:
+                    self.groups[group] = []
+                    top_level.append(("group", group, f"{group} +", group))
+                self.groups[group].append(category_id)
+            else:
+                top_level.append(("category", category_id, name, name))
+
+        self.ids = sorted(self.names, key=int)
+        for group in self.groups.values():
+            group.sort(key=lambda category_id: self.names[category_id])
+
+        # Choice numbers of the top level menu, starting at 1. Groups sort by their name, without the '+'
+        top_level.sort(key=lambda choice: choice[3])
+        self.top_level = [choice[:3] for choice in top_level]
+        self.top_level.append(("all", None, "All Categories"))
+        self.top_level.append(("random", None, "One Random Category"))
+
+    # Name of a category, None for unknown IDs
+    def name(self, category_id):
+        return self.names.get(category_id)
+
+    # ID of a category by name, with or without its group. None for unknown names
+    def category_id(self, name):
+        return self.ids_by_name.get(name.lower())
+
+    # (kind, value) of a top level menu choice: ("category", ID), ("group", group name), ("all", None) or ("random", None)
+    def top_level_choice(self, number):
+        if 1 <= number <= len(self.top_level):
+            kind, value, _ = self.top_level[number - 1]
+            return kind, value
+        return None
+
+    # ID of a group menu choice
+    def group_choice(self, group, number):
+        if 1 <= number <= len(self.groups[group]):
+            return self.groups[group][number - 1]
+        return None
+
+    # Tables are rendered through the render cache, so each menu is only laid out once
+    def top_level_table(self):
+        rows = [[f"{number}.", label] for number, (_, _, label) in enumerate(self.top_level, start=1)]
+        return render_table(rows + [["0.", "Back to Menu"]], headers=["Choice No.", "Category Name"],
+                            tablefmt="rounded_grid", colalign=("center","center"))
+
+    def group_table(self, group):
+        rows = [[f"{number}.", self.names[category_id]] for number, category_id in enumerate(self.groups[group], start=1)]
+        return render_table(rows + [["0.", "Back to Categories"]], headers=["Choice No.", "Category Name"],
+                            tablefmt="rounded_grid", colalign=("center","center"))
+
+    # Every category by ID, for the server where players type the ID
+    def id_table(self):
+        rows = sorted(([category_id, name] for category_id, name in self.full_names.items()), key=lambda row: row[1])
+        return render_table(rows + [["0", "All Categories"]], headers=["Category ID", "Category Name"],
+                            tablefmt="rounded_grid", colalign=("center","center"))
+
+
+# Fetches a quiz from the API and returns the cleaned up questions and answers
+def fetch_quiz(category, question_amount, difficulty, question_type):
+    params = {"amount": question_amount, "difficulty": difficulty, "type": question_type}
+
+    # If the user selects 'All categories', leave out the category parameter.
+    # The API will then return questions from all categories
+    if category != "all categories":
+        params["category"] = category
+
+    json_url = api_questions(params)
+    return get_questions(json_url), get_answers(json_url)
+
+
+# Raised when opentdb answers with a response code that retrying will not fix
+class TriviaAPIError(Exception):
+    pass
+
+
+# opentdb response codes
+RESPONSE_SUCCESS = 0
+RESPONSE_NO_RESULTS = 1
+RESPONSE_INVALID_PARAMETER = 2
+RESPONSE_TOKEN_NOT_FOUND = 3
+RESPONSE_TOKEN_EMPTY = 4
+RESPONSE_RATE_LIMIT = 5
+
+
+# Returns the shared API session. The session keeps connections alive between requests,
+#   so only the first request pays for the TCP and TLS handshake
+def get_api_session():
+    global api_session
+    with api_lock:
+        if api_session is None:
+            from requests.adapters import HTTPAdapter
+            from urllib3.util.retry import Retry
+
+            session = requests.Session()
+
+            # Retry connection failures and server errors with backoff. Rate limiting is handled in api_get
+            retry = Retry(total=2, connect=2, read=2, backoff_factor=0.5,
+                          status_forcelist=(500, 502, 503, 504), allowed_methods=("GET",))
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=retry)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            api_session = session
+    return api_session
+
+
+# Waits for this thread's turn to send a request.
+# Background requests reserve the next slot, api_rate_limit after the one before, so refills and prefetches
+#   waiting together are spaced out. The player's requests only wait while opentdb has reported the rate limit,
+#   and push the background slots back so a refill doesn't go out right after them.
+# Unpaced requests, like the session token before its api.php request, neither wait for nor move the slots
+def wait_for_rate_limit(paced=True):
+    global api_next_allowed
+    with api_lock:
+        slot = max(time.monotonic(), api_backoff_until)
+        if paced and getattr(api_thread, "background", False):
+            slot = max(slot, api_next_allowed)
+        if paced:
+            api_next_allowed = max(api_next_allowed, slot + api_rate_limit)
+    delay = slot - time.monotonic()
+    if delay > 0:
+        time.sleep(delay)
+
+
+# Holds back every request for the given time, for every thread using the client
+def back_off(seconds):
+    global api_backoff_until
+    with api_lock:
+        api_backoff_until = max(api_backoff_until, time.monotonic() + seconds)
+
+
+# Starts a daemon thread that fetches ahead of the player. Its requests wait behind the player's
+def start_background_thread(target, *args):
+    def run():
+        api_thread.background = True
+        target(*args)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+
+# Sends a GET request to an opentdb endpoint and returns the JSON response.
+# Rate limited responses are retried with exponential backoff, starting at opentdb's 5 second limit.
+# Token response codes are returned to the caller, other error codes raise TriviaAPIError.
+# paced=False sends the request without waiting for a slot, see wait_for_rate_limit
+def api_get(endpoint, params=None, paced=True):
+    session = get_api_session()
+    for attempt in range(api_max_attempts):
+        wait_for_rate_limit(paced)
+        response = session.get(f"{api_base_url}/{endpoint}", params=params,
+                               timeout=(api_connect_timeout, api_read_timeout))
+
+        # opentdb reports the rate limit either as HTTP 429 or as response code 5
+        if response.status_code == 429:
+            back_off(api_rate_limit * 2 ** attempt)
+            continue
+        response.raise_for_status()
+        data = response.json()
+
+        response_code = data.get("response_code", RESPONSE_SUCCESS)
+        if response_code == RESPONSE_RATE_LIMIT:
+            back_off(api_rate_limit * 2 ** attempt)
+            continue
+        if response_code == RESPONSE_NO_RESULTS:
+            raise TriviaAPIError("The API doesn't have enough questions for these settings.")
+        if response_code == RESPONSE_INVALID_PARAMETER:
+            raise TriviaAPIError("The API rejected the quiz settings.")
+        return data
+
+    raise TriviaAPIError("The API is rate limiting requests. Please try again in a few seconds.")
+
+
+# Requests a new opentdb session token. The token stops the API from handing out the same question twice.
+# The player's token is saved next to their seen questions and reused while opentdb still keeps it (6 hours),
+#   so the API also skips questions the player got in earlier runs. reuse=False always asks for a new token.
+def request_session_token(reuse=True):
+    global api_token
+    token_file = os.path.join(seen_questions_dir, f"{player_file_name()}.token")
+    if reuse:
+        try:
+            with open(token_file, "r") as file:
+                saved = json.load(file)
+            if time.time() - saved["time"] < api_token_lifetime:
+                api_token = saved["token"]
+                return api_token
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+    data = api_get("api_token.php", {"command": "request"}, paced=False)
+    api_token = data.get("token")
+    save_session_token()
+    return api_token
+
+
+# Saves the session token with the time it was last used. opentdb forgets tokens after 6 hours without use
+def save_session_token():
+    try:
+        os.makedirs(seen_questions_dir, exist_ok=True)
+        with open(os.path.join(seen_questions_dir, f"{player_file_name()}.token"), "w") as file:
+            json.dump({"token": api_token, "time": time.time()}, file)
+    except OSError:
+        pass
+
+
+# Fetches questions from api.php using the session token.
+# A missing token is requested again and an exhausted token is reset, then the request is retried once.
+def api_questions(params):
+    global api_token_generation
+    with api_token_lock:
+        if api_token is None:
+            request_session_token()
+
+    for _ in range(2):
+        token, generation = api_token, api_token_generation
+        data = api_get("api.php", {**params, "token": token})
+        response_code = data.get("response_code", RESPONSE_SUCCESS)
+
+        # Another thread may have replaced or reset the token already, then the request is just retried
+        if response_code == RESPONSE_TOKEN_NOT_FOUND:
+            with api_token_lock:
+                if api_token_generation == generation:
+                    request_session_token(reuse=False)
+                    api_token_generation += 1
+        elif response_code == RESPONSE_TOKEN_EMPTY:
+            with api_token_lock:
+                if api_token_generation == generation:
+                    api_get("api_token.php", {"command": "reset", "token": token}, paced=False)
+                    api_token_generation += 1
+        else:
+            save_session_token()
+            return data
+
+    raise TriviaAPIError("Could not get a valid session token from the API.")
+
+
+# Key used to index the question bank by category ID, difficulty and question type
+def bank_key(category, difficulty, question_type):
+    return f"{category}|{difficulty}|{question_type}"
+
+
+# Loads the question bank from disk once, later calls reuse the copy in memory.
+# With reload, the bank is read again if another process has saved it since, without the questions
+#   this process has drawn and not saved yet
+def load_question_bank(reload=False):
+    global question_bank, question_bank_version
+    with question_bank_lock:
+        if question_bank is not None and reload and file_version(question_bank_file) != question_bank_version:
+            question_bank = None
+        if question_bank is None:
+            question_bank_version = file_version(question_bank_file)
+            try:
+                with open(question_bank_file, "r") as file:
+                    question_bank = json.load(file)
+            except (OSError, ValueError):
+                question_bank = {}
+            for key, removed in question_bank_removed.items():
+                if key in question_bank:
+                    question_bank[key] = [entry for entry in question_bank[key] if entry[0] not in removed]
+    return question_bank
+
+
+# Modification time and size of a file, None if it doesn't exist
+def file_version(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+# Writes the question bank to a temporary file first and then swaps it in,
+#   so a crash halfway through never leaves a broken bank behind
+def save_question_bank():
+    global question_bank_version
+    bank = load_question_bank()
+    with question_bank_lock:
+        with atomic_write(question_bank_file) as file:
+            json.dump(bank, file)
+        question_bank_version = file_version(question_bank_file)
+        question_bank_removed.clear()
+
+
+# Saves the questions drawn since the last save, if there are any.
+# A read-only install keeps them in memory only, the questions are just drawn again in a later run
+def flush_question_bank():
+    if not question_bank_removed:
+        return
+    try:
+        with updating_question_bank():
+            pass
+    except OSError:
+        pass
+
+
+# Removes a drawn question from the bank in memory. Needs question_bank_lock
+def remove_from_question_bank(bank, key, position):
+    entry = bank[key].pop(position)
+    question_bank_removed.setdefault(key, set()).add(entry[0])
+    return entry
+
+
+# Holds the question bank's file lock for a read-modify-write of the bank, and saves it afterwards.
+# The bank is read again first if another process has changed it, so processes sharing question_bank.json
+#   take turns and never overwrite each other's changes
+@contextlib.contextmanager
+def updating_question_bank():
+    with locked_file(question_bank_file):
+        yield load_question_bank(reload=True)
+        save_question_bank()
+
+
+# Stores freshly fetched questions in the bank, skipping any question it already holds
+def add_to_question_bank(category, difficulty, question_type, questions, all_answers):
+    with updating_question_bank() as bank, question_bank_lock:
+        entries = bank.setdefault(bank_key(category, difficulty, question_type), [])
+        stored = {entry[0] for entry in entries}
+        for question, (answers, correct_answer) in zip(questions, all_answers):
+            if question not in stored:
+                entries.append([question, answers, correct_answer])
+                stored.add(question)
+
+
+# Takes questions out of the bank for a quiz.
+# Online, the questions are removed so the next quiz gets new ones, and None is returned if there are not enough stored.
+# Offline, questions are sampled without removing them and whatever is available is returned.
+def draw_from_question_bank(category, question_amount, difficulty, question_type):
+    bank = load_question_bank(reload=True)
+    with question_bank_lock:
+        # 'All categories' can draw from every stored category with the same difficulty and type
+        if category == "all categories":
+            suffix = f"|{difficulty}|{question_type}"
+            keys = [key for key in bank if key.endswith(suffix)]
+        else:
+            keys = [bank_key(category, difficulty, question_type)]
+
+        # Every (key, position) pair of a stored question that fits the settings
+        candidates = [(key, i) for key in keys for i in range(len(bank.get(key, [])))]
+
+        if len(candidates) < question_amount and not offline_mode:
+            return None
+
+        picked = random.sample(candidates, min(question_amount, len(candidates)))
+        entries = [bank[key][i] for key, i in picked]
+
+        # Remove the drawn questions, highest positions first so the remaining positions stay valid
+        if not offline_mode:
+            for key, i in sorted(picked, reverse=True):
+                remove_from_question_bank(bank, key, i)
+
+    # Answers are shuffled again on every draw so a stored question never repeats its answer order
+    questions = []
+    all_answers = []
+    for question, answers, correct_answer in entries:
+        answers = list(answers)
+        random.shuffle(answers)
+        questions.append(question)
+        all_answers.append([answers, correct_answer])
+    return questions, all_answers
+
+
+# Refills the bank for the given settings with a full batch from the API.
+# Meant to run on a background thread so the player never waits on it
+def refill_question_bank(category, difficulty, question_type):
+    try:
+        questions, all_answers = fetch_quiz(category, bank_refill_amount, difficulty, question_type)
+        add_to_question_bank(category, difficulty, question_type, questions, all_answers)
+    except Exception:
+        # A failed refill only means the next quiz goes to the API directly
+        pass
+
+
+# Starts a bank refill on a daemon thread. Returns None if a refill for the same settings is already running
+def refill_question_bank_in_background(category, difficulty, question_type):
+    key = bank_key(category, difficulty, question_type)
+    with question_bank_lock:
+        if key in refills_in_flight:
+            return None
+        done = refills_in_flight[key] = threading.Event()
+
+    def refill():
+        try:
+            refill_question_bank(category, difficulty, question_type)
+        finally:
+            with question_bank_lock:
+                del refills_in_flight[key]
+            done.set()
+
+    return start_background_thread(refill)
+
+
+# Refills the bank for the given settings and waits until it is done, for a player who has nothing left to play.
+# A refill already running for the same settings is waited on instead of fetching twice, and only if it
+#   didn't bring any questions is the API asked again. Unlike refill_question_bank, errors are raised
+def refill_question_bank_now(category, difficulty, question_type):
+    key = bank_key(category, difficulty, question_type)
+    while True:
+        with question_bank_lock:
+            running = refills_in_flight.get(key)
+            if running is None:
+                done = refills_in_flight[key] = threading.Event()
+                break
+        running.wait()
+        if question_bank_size(category, difficulty, question_type) > 0:
+            return
+
+    try:
+        questions, all_answers = fetch_quiz(category, bank_refill_amount, difficulty, question_type)
+        add_to_question_bank(category, difficulty, question_type, questions, all_answers)
+    finally:
+        with question_bank_lock:
+            del refills_in_flight[key]
+        done.set()
+
+
+# Number of stored questions for the given settings. 'All categories' counts every stored category
+def question_bank_size(category, difficulty, question_type):
+    bank = load_question_bank()
+    with question_bank_lock:
+        if category == "all categories":
+            suffix = f"|{difficulty}|{question_type}"
+            return sum(len(entries) for key, entries in bank.items() if key.endswith(suffix))
+        return len(bank.get(bank_key(category, difficulty, question_type), []))
+
+
+# Position of a random one of count questions that is new, or of any of them if none is.
+# question_at(i) gives the question text at position i. A few random tries find a new question quickly
+#   while most are new, and a scan from a random position finds the last ones
+def random_new_position(count, question_at, is_new):
+    for _ in range(pool_low_water):
+        position = random.randrange(count)
+        if is_new(question_at(position)):
+            return position
+
+    start = random.randrange(count)
+    for step in range(count):
+        position = (start + step) % count
+        if is_new(question_at(position)):
+            return position
+    return start
+
+
+# Takes one question out of the bank in O(1), as [question, answers, correct_answer], or None if there are none.
+# Questions in drawn (already in the quiz) and in the player's seen questions are skipped. Online, the newest
+#   new question is taken, looking at no more than pool_low_water questions so a take stays cheap,
+#   and the newest question if they have all been seen.
+# Only the bank in memory changes, see question_bank_removed.
+# Offline, a random new question is picked without removing it.
+# A loaded question pack comes first, its questions are never used up, so they only repeat once every
+#   question of the settings has been drawn or seen
+def take_from_question_bank(category, difficulty, question_type, seen=None, drawn=()):
+    key = bank_key(category, difficulty, question_type)
+
+    def is_new(question):
+        return question not in drawn and (seen is None or question not in seen)
+
+    if question_pack is not None and (entry := question_pack.random_entry(key, is_new)):
+        return entry
+
+    bank = load_question_bank(reload=True)
+    with question_bank_lock:
+        entries = bank.get(key)
+        if not entries:
+            return None
+        if offline_mode:
+            return entries[random_new_position(len(entries), lambda i: entries[i][0], is_new)]
+
+        position = len(entries) - 1
+        for i in range(len(entries) - 1, max(len(entries) - 1 - pool_low_water, -1), -1):
+            if is_new(entries[i][0]):
+                position = i
+                break
+        return remove_from_question_bank(bank, key, position)
+
+
+# Read-only pack of questions in a compact binary file, for offline banks far bigger than question_bank.json.
+# The file is memory-mapped and only the index is read on open, so opening takes the same time whatever the size,
+#   and only the questions a quiz actually uses are paged in from disk.
+# Layout, all little-endian:
+#   header  magic, version, index position and index length (question_pack_header)
+#   tables  per bank key, the file position of each of its records (question_pack_offset each)
+#   records per question, the amount of answers as one byte, then the UTF-8 length of the question,
+#           the correct answer and every answer as 2 bytes each, then the texts themselves
+#   index   JSON mapping each bank key to the position of its table and its amount of questions
+# Texts are stored already cleaned up by text_cleanup, so drawing needs no further work.
+class QuestionPack:
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as file:
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            magic, version, index_offset, index_length = question_pack_header.unpack_from(self.data, 0)
+            if magic != question_pack_magic or version != question_pack_version:
+                raise ValueError
+            self.index = json.loads(self.data[index_offset:index_offset + index_length])
+        except (struct.error, ValueError):
+            self.data.close()
+            raise ValueError(f"{path} is not a version {question_pack_version} question pack") from None
+
+    # Amount of questions stored under a bank key
+    def count(self, key):
+        return self.index.get(key, (0, 0))[1]
+
+    # Question number i of a bank key, as [question, answers, correct_answer]
+    def entry(self, key, i):
+        table, _ = self.index[key]
+        position = question_pack_offset.unpack_from(self.data, table + i * question_pack_offset.size)[0]
+        answer_count = self.data[position]
+        lengths = struct.unpack_from(f"<{answer_count + 2}H", self.data, position + 1)
+        position += 1 + 2 * len(lengths)
+
+        texts = []
+        for length in lengths:
+            texts.append(self.data[position:position + length].decode("utf-8"))
+            position += length
+        return [texts[0], texts[2:], texts[1]]
+
+    # A random question of a bank key, or None if the pack has none for it.
+    # With is_new, a question it accepts is picked if the key has one left, see random_new_position
+    def random_entry(self, key, is_new=None):
+        count = self.count(key)
+        if count == 0:
+            return None
+        if is_new is None:
+            return self.entry(key, random.randrange(count))
+        return self.entry(key, random_new_position(count, lambda i: self.entry(key, i)[0], is_new))
+
+    # Draws a quiz for the given settings, like draw_from_question_bank.
+    # Returns None if the pack has no questions for the settings, or online, if it has fewer than asked for
+    def draw(self, category, question_amount, difficulty, question_type):
+        if category == "all categories":
+            suffix = f"|{difficulty}|{question_type}"
+            keys = [key for key in self.index if key.endswith(suffix)]
+        else:
+            keys = [bank_key(category, difficulty, question_type)]
+
+        # Questions are numbered across all keys, starts[n] being the number of the first question of keys[n]
+        starts = []
+        total = 0
+        for key in keys:
+            starts.append(total)
+            total += self.count(key)
+
+        if total == 0 or (total < question_amount and not offline_mode):
+            return None
+
+        questions = []
+        all_answers = []
+        for number in random.sample(range(total), min(question_amount, total)):
+            n = bisect.bisect_right(starts, number) - 1
+            question, answers, correct_answer = self.entry(keys[n], number - starts[n])
+            random.shuffle(answers)
+            questions.append(question)
+            all_answers.append([answers, correct_answer])
+        return questions, all_answers
+
+    def close(self):
+        self.data.close()
+
+
+# Writes a question pack from a mapping of bank key to [question, answers, correct_answer] entries,
+#   like the question bank holds. The pack is written to a temporary file first and then swapped in
+def write_question_pack(path, bank):
+    index = {}
+    with atomic_write(path, "wb") as file:
+        # Room for the header, written last once the index position is known
+        file.write(bytes(question_pack_header.size))
+
+        for key in sorted(bank):
+            records = []
+            for question, answers, correct_answer in bank[key]:
+                texts = [text.encode("utf-8") for text in [question, correct_answer, *answers]]
+                records.append(struct.pack(f"<B{len(texts)}H", len(answers), *map(len, texts)) + b"".join(texts))
+            if not records:
+                continue
+
+            table = file.tell()
+            position = table + len(records) * question_pack_offset.size
+            for record in records:
+                file.write(question_pack_offset.pack(position))
+                position += len(record)
+            for record in records:
+                file.write(record)
+            index[key] = [table, len(records)]
+
+        index_offset = file.tell()
+        index_data = json.dumps(index).encode("utf-8")
+        file.write(index_data)
+        file.seek(0)
+        file.write(question_pack_header.pack(question_pack_magic, question_pack_version, index_offset, len(index_data)))
+    return sum(count for _, count in index.values())
+
+
+# Builds a question pack from saved opentdb responses, each a JSON file with one response or a list of them.
+# Questions are cleaned up once here and stored under the category ID of their category name.
+# Without any response files, the local question bank is packed instead. Returns the amount of questions packed
+def export_question_pack(path, response_files=()):
+    if not response_files:
+        bank = load_question_bank()
+        with question_bank_lock:
+            return write_question_pack(path, bank)
+
+    registry = get_category_registry()
+    bank = {}
+    stored = {}
+    for response_file in response_files:
+        with open(response_file, "r") as file:
+            responses = json.load(file)
+        if isinstance(responses, dict):
+            responses = [responses]
+
+        for response in responses:
+            for result, question, answers in zip(response["results"], get_questions(response), get_answers(response)):
+                category = registry.category_id(text_cleanup(result["category"]))
+                if category is None:
+                    continue
+                key = bank_key(category, result["difficulty"], result["type"])
+                if question not in stored.setdefault(key, set()):
+                    stored[key].add(question)
+                    bank.setdefault(key, []).append([question, answers[0], answers[1]])
+    return write_question_pack(path, bank)
+
+
+# Opens the question pack quizzes are drawn from first
+def open_question_pack(path):
+    global question_pack
+    question_pack = QuestionPack(path)
+    return question_pack
+
+
+# Gets the questions and answers for a quiz.
+# With a player's seen questions, questions the player has already seen are skipped as long as
+#   there are new ones to replace them, and only played again when there is nothing new left.
+def get_quiz(category, question_amount, difficulty, question_type, seen=None):
+    if seen is None:
+        return load_quiz(category, question_amount, difficulty, question_type)
+
+    questions, all_answers = [], []
+    repeats = []
+    picked = set()
+    for _ in range(seen_fetch_attempts):
+        batch = load_quiz(category, question_amount - len(questions), difficulty, question_type)
+        if not batch or not batch[0]:
+            break
+        for question, answers in zip(*batch):
+            if question in picked:
+                continue
+            picked.add(question)
+            if question in seen:
+                repeats.append((question, answers))
+            else:
+                questions.append(question)
+                all_answers.append(answers)
+        if len(questions) >= question_amount:
+            break
+
+    # Not enough new questions, fill up with ones the player has seen before
+    for question, answers in repeats[:question_amount - len(questions)]:
+        questions.append(question)
+        all_answers.append(answers)
+    return questions[:question_amount], all_answers[:question_amount]
+
+
+# Loads the questions and answers for a quiz.
+# Uses the question pack if one is open, then the question bank, and falls back to the API,
+#   then tops the bank back up in the background once it runs low.
+def load_quiz(category, question_amount, difficulty, question_type):
+    if question_pack is not None:
+        drawn = question_pack.draw(category, question_amount, difficulty, question_type)
+        if drawn is not None:
+            return drawn
+
+    drawn = draw_from_question_bank(category, question_amount, difficulty, question_type)
+
+    if offline_mode:
+        return drawn
+
+    # A prefetch waits for a refill already running for the same settings and draws from it,
+    #   instead of asking the API for the same questions a second time
+    if drawn is None and getattr(api_thread, "background", False):
+        with question_bank_lock:
+            running = refills_in_flight.get(bank_key(category, difficulty, question_type))
+        if running is not None:
+            running.wait()
+            drawn = draw_from_question_bank(category, question_amount, difficulty, question_type)
+
+    if drawn is None:
+        drawn = fetch_quiz(category, question_amount, difficulty, question_type)
+
+    if question_bank_size(category, difficulty, question_type) < max(question_amount, pool_low_water):
+        refill_question_bank_in_background(category, difficulty, question_type)
+    return drawn
+
+
+# Fetches a marathon quiz in API sized batches on a background thread.
+# Returns a queue that gets each batch as (questions, all_answers) as soon as it arrives, then None when done.
+# A failure puts the exception on the queue instead and ends the quiz there.
+def fetch_in_batches(category, question_amount, difficulty, question_type, seen=None):
+    batches = queue.Queue()
+    thread = threading.Thread(target=run_batch_schedule, daemon=True,
+                              args=(batches, category, question_amount, difficulty, question_type, seen))
+    thread.start()
+    return batches
+
+
+# Plans which category each batch is fetched from. 'All categories' takes turns between every category,
+#   so a marathon quiz stays mixed and no single category runs out of questions
+def batch_categories(category):
+    if category == "all categories":
+        categories = list(get_category_registry().ids)
+        random.shuffle(categories)
+        return categories
+    return [category]
+
+
+# Fetches the batches of a marathon quiz one after another and puts them on the queue.
+# The batches are sent opentdb's rate limit apart, so they never get the IP rate limited.
+# Any failure ends up on the queue, so the player is never left waiting on a thread that has stopped.
+def run_batch_schedule(batches, category, question_amount, difficulty, question_type, seen):
+    try:
+        schedule_batches(batches, category, question_amount, difficulty, question_type, seen)
+    except (TriviaAPIError, requests.RequestException) as error:
+        batches.put(error)
+    except Exception as error:
+        # Anything else is a response the client doesn't understand, reported to the player like an API error
+        unexpected = TriviaAPIError(f"Unexpected response from the API ({error!r}).")
+        unexpected.__cause__ = error
+        batches.put(unexpected)
+
+
+# The work of run_batch_schedule
+def schedule_batches(batches, category, question_amount, difficulty, question_type, seen):
+    categories = batch_categories(category)
+    delivered = set()
+    turn = 0
+
+    # Largest batch to ask each category for, lowered to the category's cached question count when a full batch fails
+    batch_sizes = {}
+
+    # Some batches come back smaller (seen questions are dropped), so a few extra requests are allowed for those.
+    # Only batches that come back short count against them. Requests for a category that has run out don't count,
+    #   the category is just left out from then on
+    requests_left = 2 * -(-question_amount // bank_refill_amount)
+    next_request = 0.0
+    while requests_left > 0 and len(delivered) < question_amount and categories:
+        batch_category = categories[turn % len(categories)]
+        amount = min(batch_sizes.get(batch_category, bank_refill_amount), question_amount - len(delivered))
+        delay = next_request - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        try:
+            questions, all_answers = fetch_quiz(batch_category, amount, difficulty, question_type)
+        except TriviaAPIError as error:
+            # A category with fewer questions than asked for is asked again for as many as it has, once
+            counts = cached_question_counts(batch_category) if batch_category not in batch_sizes else None
+            if counts is not None and counts.get(difficulty) and counts[difficulty] < amount:
+                batch_sizes[batch_category] = counts[difficulty]
+                continue
+
+            # A mixed quiz carries on without a category that ran out, a single category quiz ends here
+            if len(categories) > 1:
+                categories.remove(batch_category)
+                continue
+            batches.put(error if not delivered else None)
+            return
+        finally:
+            next_request = time.monotonic() + api_rate_limit
+        turn += 1
+
+        # Drop questions the player has seen or that already came in an earlier batch
+        batch = [(question, answers) for question, answers in zip(questions, all_answers)
+                 if question not in delivered and (seen is None or question not in seen)]
+        if len(batch) < amount:
+            requests_left -= 1
+        if not batch:
+            continue
+        delivered.update(question for question, _ in batch)
+        if seen is not None:
+            seen.update(question for question, _ in batch)
+        batches.put(([question for question, _ in batch], [answers for _, answers in batch]))
+
+    if seen is not None:
+        seen.save()
+    batches.put(None)
+
+
+# Difficulty for an adaptive quiz, from the same streak tiers score_multiplier uses.
+# A streak worth the base 10 points gets easy questions, 12 to 15 points medium, and 20 points or more hard.
+# A wrong answer resets the streak, so the difficulty drops back down
+def adaptive_difficulty(streak):
+    points = score_multiplier(streak)
+    if points <= 10:
+        return "easy"
+    elif points <= 15:
+        return "medium"
+    return "hard"
+
+
+# Questions for an adaptive quiz, drawn one at a time from the question bank, which is indexed by
+#   category, difficulty and type so each draw is O(1).
+# Each difficulty is refilled in the background once it drops below pool_low_water, so a change of difficulty
+#   never waits on the network. Only when every difficulty is empty does a draw wait for the API.
+class AdaptiveQuiz:
+    difficulties = ["easy", "medium", "hard"]
+
+    def __init__(self, category, question_amount, question_type, seen=None):
+        self.category = category
+        self.remaining = question_amount
+        self.question_type = question_type
+        self.seen = seen
+
+        # Questions this quiz has asked, never asked twice while the settings have other questions
+        self.drawn = set()
+        for difficulty in self.difficulties:
+            self.restock(difficulty)
+
+    # Starts a background refill of a difficulty running low. A question pack with the difficulty never runs low
+    def restock(self, difficulty):
+        if question_pack is not None and question_pack.count(bank_key(self.category, difficulty, self.question_type)):
+            return
+        if not offline_mode and question_bank_size(self.category, difficulty, self.question_type) < pool_low_water:
+            refill_question_bank_in_background(self.category, difficulty, self.question_type)
+
+    # Draws the next question for the streak as a batch of one ([question], [[answers, correct_answer]]),
+    #   or None once the quiz has all its questions
+    def draw(self, streak):
+        if self.remaining <= 0:
+            return None
+
+        # The difficulty the streak calls for first, then the closest other difficulties
+        target = self.difficulties.index(adaptive_difficulty(streak))
+        order = sorted(self.difficulties, key=lambda difficulty: abs(self.difficulties.index(difficulty) - target))
+
+        entry = self.take(order)
+        if entry is None and not offline_mode:
+            # Every difficulty is empty, wait for the API this once
+            refill_question_bank_now(self.category, order[0], self.question_type)
+            entry = self.take(order)
+        if entry is None:
+            return None
+
+        self.remaining -= 1
+        if self.remaining == 0:
+            # Persist the bank without the questions this quiz used, and the questions the player has now seen
+            flush_question_bank()
+            if self.seen is not None:
+                self.seen.save()
+
+        question, answers, correct_answer = entry
+        return [question], [[random.sample(answers, len(answers)), correct_answer]]
+
+    # Takes a question from the first difficulty that has one, preferring questions the player hasn't seen
+    def take(self, order):
+        for difficulty in order:
+            entry = take_from_question_bank(self.category, difficulty, self.question_type, self.seen, self.drawn)
+            self.restock(difficulty)
+            if entry is not None:
+                self.drawn.add(entry[0])
+                if self.seen is not None:
+                    self.seen.add(entry[0])
+                return entry
+        return None
+
+
+# Loads the next quiz for the given settings on a background thread
+def prefetch_next_quiz(category, question_amount, difficulty, question_type):
+    global prefetched_quiz
+
+    # Offline quizzes come straight from the bank, there is nothing to wait for
+    if offline_mode:
+        return
+
+    slot = {"settings": (category, question_amount, difficulty, question_type), "result": None}
+
+    def load():
+        try:
+            slot["result"] = get_quiz(category, question_amount, difficulty, question_type, get_seen_questions())
+        except Exception:
+            # A failed prefetch only means the next quiz is loaded the normal way
+            pass
+
+    slot["thread"] = start_background_thread(load)
+    prefetched_quiz = slot
+
+
+# Returns the prefetched quiz if it was loaded for the same settings, otherwise None.
+# A prefetched quiz for other settings is dropped and its questions go back to the question bank.
+def take_prefetched_quiz(category, question_amount, difficulty, question_type):
+    global prefetched_quiz
+    slot, prefetched_quiz = prefetched_quiz, None
+
+    if slot is None:
+        return None
+
+    if slot["settings"] != (category, question_amount, difficulty, question_type):
+        threading.Thread(target=return_to_question_bank, args=(slot,), daemon=True).start()
+        return None
+
+    # Usually already finished, since the player spent a whole quiz answering questions
+    slot["thread"].join()
+    return slot["result"]
+
+
+# Puts the questions of a dropped prefetch back into the question bank
+def return_to_question_bank(slot):
+    slot["thread"].join()
+    if slot["result"] is not None:
+        category, _, difficulty, question_type = slot["settings"]
+        questions, all_answers = slot["result"]
+        add_to_question_bank(category, difficulty, question_type, questions, all_answers)
+
+
+# Quizzes being loaded for server players, shared by every player waiting on the same settings
+server_loading = {}
+
+
+# Asks a connected player a question and returns their answer.
+# Raises ConnectionResetError when the player disconnects
+async def ask(reader, writer, prompt):
+    writer.write(prompt.encode())
+    await writer.drain()
+    line = await reader.readline()
+    if not line:
+        raise ConnectionResetError
+    return line.decode(errors="replace").strip()
+
+
+# Sends text to a connected player
+async def send(writer, text):
+    writer.write((text + "\n").encode())
+    await writer.drain()
+
+
+# Loads a quiz for a server player. Players asking for the same settings at the same time share one fetch,
+#   and the fetch itself runs on a worker thread so the server keeps serving everyone else
+async def load_quiz_shared(category, question_amount, difficulty, question_type):
+    settings = (category, question_amount, difficulty, question_type)
+    future = server_loading.get(settings)
+    if future is None:
+        future = asyncio.get_running_loop().run_in_executor(None, get_quiz, *settings)
+        server_loading[settings] = future
+        future.add_done_callback(lambda _: server_loading.pop(settings, None))
+    questions, all_answers = await asyncio.shield(future)
+
+    # Every player gets their own answer order, and their own lists for hints to remove from
+    all_answers = [[random.sample(answers, len(answers)), correct_answer] for answers, correct_answer in all_answers]
+    return questions, all_answers
+
+
+# Asks a server player for the quiz settings. Returns the category, amount, difficulty and type
+async def ask_quiz_settings(reader, writer):
+    registry = get_category_registry()
+    await send(writer, registry.id_table())
+    while True:
+        category = await ask(reader, writer, "Desired Category ID: ")
+        if category == "0":
+            category = "all categories"
+            break
+        if registry.name(category) is not None:
+            break
+        await send(writer, "Invalid Category Selection.")
+
+    while True:
+        try:
+            question_amount = int(await ask(reader, writer, "How many questions would you like to play for (1 - 50)? "))
+            if 1 <= question_amount <= 50:
+                break
+        except ValueError:
+            pass
+        await send(writer, "Invalid amount")
+
+    while True:
+        try:
+            difficulty = parse_difficulty(await ask(reader, writer, "Select a difficulty (Easy, Medium, Hard): "))
+            # Server quizzes are fetched up front, so they can't adapt to the player's streak
+            if difficulty != "adaptive":
+                break
+            await send(writer, "Adaptive difficulty is only available in the terminal game.")
+        except ValueError:
+            await send(writer, "Invalid difficulty.")
+
+    while True:
+        choice = (await ask(reader, writer, "Mutliple choice (M), or True/False (T): ")).upper()
+        if choice in ["M", "T"]:
+            question_type = "multiple" if choice == "M" else "boolean"
+            break
+        await send(writer, "Invalid Question Type")
+
+    return category, question_amount, difficulty, question_type
+
+
+# Plays one quiz with a server player, with the same scoring, streak and hint rules as the terminal game
+async def play_server_quiz(reader, writer, questions, all_answers, question_type):
+    session = QuizSession(questions, all_answers, question_type)
+    while not session.finished:
+        number, question, option_labels, answers = session.current()
+        await send(writer, f"\nQuestion {number}/{len(session.questions)}: {question}")
+        await send(writer, render_table(list(zip(option_labels, answers)), cache=False, headers=["Option", "Answer"], tablefmt="rounded_grid"))
+
+        while True:
+            user_input = (await ask(reader, writer, f"Please enter your answer ({', '.join(option_labels)}). Enter 'H' for a hint(-10 Pts.): ")).upper()
+            if user_input == "H" and session.hint_available:
+                if session.hint():
+                    await send(writer, "Hint used! One wrong answer removed (cost: -10 points).")
+                else:
+                    await send(writer, "No incorrect answers available to remove.")
+                number, question, option_labels, answers = session.current()
+                await send(writer, render_table(list(zip(option_labels, answers)), cache=False, headers=["Option", "Answer"], tablefmt="rounded_grid"))
+            elif user_input in option_labels:
+                break
+            else:
+                await send(writer, f"Invalid input. Please choose one of {option_labels}.")
+
+        result = session.answer(user_input)
+        if result["correct"]:
+            await send(writer, f"Correct! Current streak: 🔥 {result['streak']}  +{result['points']} points!  CURRENT SCORE: {result['score']} points")
+        else:
+            await send(writer, f"Whoops! That was wrong. The correct answer was: {result['correct_answer']}  CURRENT SCORE: {result['score']} points")
+    return session.summary()
+
+
+# Handles one connected player: quiz settings, the quiz, and the leaderboard, for as many games as they like
+async def serve_player(reader, writer):
+    try:
+        await send(writer, render_banner("Brainstorm Blitz!"))
+        while True:
+            category, question_amount, difficulty, question_type = await ask_quiz_settings(reader, writer)
+            try:
+                questions, all_answers = await load_quiz_shared(category, question_amount, difficulty, question_type)
+            except (requests.RequestException, TriviaAPIError) as error:
+                await send(writer, f"Could not load the quiz: {error}")
+                continue
+            if not questions:
+                await send(writer, "No stored questions for these settings.")
+                continue
+
+            summary = await play_server_quiz(reader, writer, questions, all_answers, question_type)
+            await send(writer, f"\nQuiz complete! Your final score: {summary['score']} points!")
+
+            name = await ask(reader, writer, "Enter your name for the leaderboard (leave empty to skip): ")
+            if name:
+                # Off the event loop. Scores of players finishing together are written as one batch
+                await asyncio.get_running_loop().run_in_executor(
+                    None, add_to_leaderboard, name, summary["score"], summary["highest_streak"],
+                    summary["questions"], summary["hints_used"], summary["correct_answers"])
+                await send(writer, format_leaderboard(get_leaderboard().top(leaderboard_page_size)))
+
+            if (await ask(reader, writer, "Would you like to play again? (Y/N): ")).upper() != "Y":
+                await send(writer, "Goodbye! Thanks for playing!")
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        # The player disconnected, nothing left to clean up but the connection
+        pass
+    finally:
+        writer.close()
+
+
+# Runs the multi-player server. Every connection plays its own quiz on the same event loop
+async def serve(host, port):
+    server = await asyncio.start_server(serve_player, host, port)
+    print(f"Brainstorm Blitz! server listening on {host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+# Read-only JSON view of a leaderboard for lobby screens and dashboards.
+# Responses are cached until one of the leaderboard's files changes, so polling an unchanged leaderboard
+#   costs a few stat calls, and clients sending the ETag back in If-None-Match get an empty 304 answer.
+# Changes by other processes are seen too, since they change the same files.
+class LeaderboardSnapshot:
+    def __init__(self, board=None):
+        self.board = board
+        self.lock = threading.Lock()
+        self.version = None
+        self.responses = {}
+
+    # Modification time and size of every leaderboard file, None for files that don't exist
+    def file_version(self):
+        version = []
+        for path in get_leaderboard(self.board).files():
+            try:
+                stat = os.stat(path)
+                version.append((stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                version.append(None)
+        return version
+
+    # Returns (status, body, etag) for a request path like /leaderboard?limit=10 or /players/<name>.
+    # Bodies are built once per leaderboard version
+    def response(self, path):
+        version = self.file_version()
+        with self.lock:
+            if version != self.version or len(self.responses) >= http_cache_size:
+                self.version = version
+                self.responses = {}
+            if path not in self.responses:
+                status, data = self.build(path)
+                body = json.dumps(data).encode("utf-8")
+                self.responses[path] = (status, body, f'"{hashlib.sha1(body).hexdigest()}"')
+            return self.responses[path]
+
+    # Builds the status and JSON data of a request path
+    def build(self, path):
+        url = urllib_parse.urlsplit(path)
+        query = urllib_parse.parse_qs(url.query)
+        backend = get_leaderboard(self.board)
+
+        if url.path in ["/", "/leaderboard"]:
+            try:
+                limit = min(max(int(query.get("limit", [leaderboard_page_size])[0]), 1), http_leaderboard_limit)
+            except ValueError:
+                return 400, {"error": "limit must be a number"}
+            entries = [{"rank": rank, "name": name, "score": score, "highest_streak": highest_streak,
+                        "questions_played": num_questions, "hints_used": hints_used}
+                       for rank, (name, score, highest_streak, num_questions, hints_used, *_) in
+                       enumerate(backend.top(limit), start=1)]
+            return 200, {"board": self.board, "entries": entries}
+
+        if url.path.startswith("/players/"):
+            name = urllib_parse.unquote(url.path[len("/players/"):])
+            stats = backend.player_stats(name)
+            if stats is None:
+                return 404, {"error": f"{name} is not on the leaderboard"}
+            return 200, {"board": self.board, "name": name, "rank": backend.rank(name),
+                         "percentile": backend.percentile(name), **stats}
+
+        return 404, {"error": "not found"}
+
+
+# Serves a leaderboard as JSON over HTTP until interrupted. Every request is handled on its own thread:
+#   GET /leaderboard?limit=N for the top N entries, GET /players/<name> for a player's statistics
+def serve_leaderboard_http(host, port, board=None):
+    snapshot = LeaderboardSnapshot(board)
+
+    class LeaderboardHandler(http_server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            status, body, etag = snapshot.response(self.path)
+            if status == 200 and etag in [tag.strip().removeprefix("W/") for tag in
+                                          self.headers.get("If-None-Match", "").split(",")]:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+            self.wfile.write(body)
+
+        # Polling clients would flood the terminal with request logs
+        def log_message(self, format, *args):
+            pass
+
+    server = http_server.ThreadingHTTPServer((host, port), LeaderboardHandler)
+    server.daemon_threads = True
+    print(f"Brainstorm Blitz! leaderboard served at http://{host}:{server.server_address[1]}/leaderboard")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+# File name for the player's files, keeping only characters that are safe in file names
+def player_file_name():
+    return "".join(character for character in player_name if character.isalnum() or character in "-_") or "guest"
+
+
+# Returns the seen questions of the current player, loaded from disk on first use
+def get_seen_questions():
+    global seen_questions
+    if seen_questions is None:
+        seen_questions = SeenQuestions(os.path.join(seen_questions_dir, f"{player_file_name()}.seen"))
+    return seen_questions
+
+
+# Normalized hash of a question: cleaned up, lower case and with whitespace collapsed,
+#   so the same question matches however the API escaped or spaced it
+def question_hash(question):
+    normalized = " ".join(text_cleanup(question).lower().split())
+    return hashlib.sha256(normalized.encode()).digest()
+
+
+# Questions a player has seen, kept in Bloom filters of fixed size.
+# Once the current filter holds seen_capacity questions it becomes the previous one and a new filter is started,
+#   so memory stays at two filters and the oldest questions are slowly forgotten.
+# A Bloom filter can report an unseen question as seen (about 1% of the time), never the other way around.
+# The game, a prefetch and a marathon's batch thread share one instance, so every method that touches the filters holds the lock.
+class SeenQuestions:
+    # Bits per remembered question and hashes per question, for about a 1% false positive rate
+    bits_per_question = 10
+    hash_count = 7
+    header = struct.Struct("<4sII")
+    magic = b"BBSQ"
+
+    def __init__(self, path, capacity=None):
+        self.path = path
+        self.capacity = capacity or seen_capacity
+        self.size = self.capacity * self.bits_per_question
+        self.count = 0
+        self.current = bytearray((self.size + 7) // 8)
+        self.previous = bytearray((self.size + 7) // 8)
+        self.lock = threading.RLock()
+        self.load()
+
+    # Bit positions of a question, from two halves of its hash (double hashing)
+    def positions(self, question):
+        digest = question_hash(question)
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:16], "little") | 1
+        return [(first + i * second) % self.size for i in range(self.hash_count)]
+
+    def __contains__(self, question):
+        positions = self.positions(question)
+        with self.lock:
+            return (all(self.current[bit >> 3] & (1 << (bit & 7)) for bit in positions) or
+                    all(self.previous[bit >> 3] & (1 << (bit & 7)) for bit in positions))
+
+    def add(self, question):
+        positions = self.positions(question)
+        with self.lock:
+            if self.count >= self.capacity:
+                self.previous = self.current
+                self.current = bytearray(len(self.previous))
+                self.count = 0
+            for bit in positions:
+                self.current[bit >> 3] |= 1 << (bit & 7)
+            self.count += 1
+
+    def update(self, questions):
+        with self.lock:
+            for question in questions:
+                if question not in self:
+                    self.add(question)
+
+    # Reads the filters from disk. A missing file or a file with other sizes starts empty
+    def load(self):
+        try:
+            with open(self.path, "rb") as file:
+                magic, count, size = self.header.unpack(file.read(self.header.size))
+                if magic != self.magic or size != self.size:
+                    return
+                current = file.read(len(self.current))
+                previous = file.read(len(self.previous))
+        except (OSError, struct.error):
+            return
+        with self.lock:
+            if len(current) == len(self.current) and len(previous) == len(self.previous):
+                self.count, self.current, self.previous = count, bytearray(current), bytearray(previous)
+
+    # Writes the filters to a temporary file and swaps it in
+    def save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with self.lock, atomic_write(self.path, "wb") as file:
+                file.write(self.header.pack(self.magic, self.count, self.size))
+                file.write(self.current)
+                file.write(self.previous)
+        except OSError:
+            pass
+
+
+# Phases timed when profiling, with the functions that belong to each phase.
+# Phases nest: start_game includes everything that happens while a quiz is set up and played
+profile_phases = {"start_game": ["start_game"],
+                  "question_count": ["question_count"],
+                  "api": ["api_get"],
+                  "parsing": ["get_questions", "get_answers"],
+                  "text_cleanup": ["text_cleanup"],
+                  "leaderboard": ["add_to_leaderboard", "display_leaderboard"],
+                  "rendering": ["render_banner", "render_table"],
+                  "user input": ["input"]}
+
+# Per phase and function: number of calls, total time and longest call
+profile_timings = {}
+profile_lock = threading.Lock()
+
+
+# Wraps a function so every call adds its time to a phase
+def timed(phase, name, function):
+    key = (phase, name)
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            with profile_lock:
+                record = profile_timings.setdefault(key, [0, 0.0, 0.0])
+                record[0] += 1
+                record[1] += elapsed
+                record[2] = max(record[2], elapsed)
+    return wrapper
+
+
+# Turns on timing of every profiled phase, and prints a summary when the game exits.
+# The functions are only wrapped here, so a game without profiling runs the plain functions with no overhead.
+# json_path also writes the timings as JSON, cprofile_path records the whole run with cProfile.
+def enable_profiling(json_path=None, cprofile_path=None):
+    module = sys.modules[__name__]
+    for phase, names in profile_phases.items():
+        for name in names:
+            # input is a builtin, so the wrapper is added as a module global that shadows it
+            function = getattr(module, name, None) or getattr(builtins, name)
+            setattr(module, name, timed(phase, name, function))
+    Frame.show = timed("rendering", "Frame.show", Frame.show)
+
+    profiler = None
+    if cprofile_path:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    atexit.register(report_profile, json_path, profiler, cprofile_path)
+
+
+# Prints the profiling summary and writes the requested profile files
+def report_profile(json_path=None, profiler=None, cprofile_path=None):
+    if profiler is not None:
+        profiler.disable()
+        profiler.dump_stats(cprofile_path)
+
+    with profile_lock:
+        rows = sorted(profile_timings.items(), key=lambda item: item[1][1], reverse=True)
+
+    table = [[phase, name, calls, f"{total:.4f}", f"{total / calls * 1000:.3f}", f"{longest * 1000:.3f}"]
+             for (phase, name), (calls, total, longest) in rows]
+    print("\nProfile (seconds in each phase, nested phases are included in their parents):", file=sys.stderr)
+    # tabulate directly, render_table is one of the timed functions
+    print(tabulate_module.tabulate(table, headers=["Phase", "Function", "Calls", "Total (s)", "Mean (ms)", "Max (ms)"],
+                                   tablefmt="rounded_grid"), file=sys.stderr)
+
+    if json_path:
+        with open(json_path, "w") as file:
+            json.dump([{"phase": phase, "function": name, "calls": calls, "total": total, "max": longest}
+                       for (phase, name), (calls, total, longest) in rows], file, indent=2)
+
+
+# How often a simulated player answers correctly, by difficulty
+bot_accuracy = {"easy": 0.8, "medium": 0.6, "hard": 0.4}
+
+# How often a simulated player uses a hint on a multiple choice question
+bot_hint_rate = 0.2
+
+
+# Local stand-in for the API in simulations. Builds an API style response with HTML entities,
+#   so every game still goes through get_questions, get_answers and text_cleanup
+def fake_api_response(category, question_amount, difficulty, question_type, rng):
+    results = []
+    for i in range(question_amount):
+        number = rng.randrange(1_000_000)
+        if question_type == "boolean":
+            correct_answer, incorrect_answers = rng.choice([("True", ["False"]), ("False", ["True"])])
+        else:
+            correct_answer = f"Answer &quot;{number}&quot;"
+            incorrect_answers = [f"Wrong answer {number}.{j} &amp; more" for j in range(3)]
+        results.append({"category": category, "difficulty": difficulty, "type": question_type,
+                        "question": f"Simulated question {number} about category {category}? It&#039;s {i}",
+                        "correct_answer": correct_answer, "incorrect_answers": incorrect_answers})
+    return {"response_code": 0, "results": results}
+
+
+# Plays one game as a bot: picks a category from the menu, plays the quiz with QuizSession,
+#   and submits the score. Returns the time the game took and the time the leaderboard write took
+def play_bot_game(bot_name, rng):
+    start = time.perf_counter()
+
+    # Category choice the same way a player makes it in the category menu
+    registry = get_category_registry()
+    kind, value = registry.top_level_choice(rng.randint(1, len(registry.top_level)))
+    if kind == "group":
+        category = rng.choice(registry.groups[value])
+    elif kind == "category":
+        category = value
+    elif kind == "random":
+        category = rng.choice(registry.ids)
+    else:
+        category = "all categories"
+
+    question_amount = rng.randint(5, bank_refill_amount)
+    difficulty = rng.choice(["easy", "medium", "hard"])
+    question_type = rng.choice(["multiple", "boolean"])
+    response = fake_api_response(category, question_amount, difficulty, question_type, rng)
+
+    session = QuizSession(get_questions(response), get_answers(response), question_type)
+    while not session.finished:
+        if session.hint_available and rng.random() < bot_hint_rate:
+            session.hint()
+        number, question, option_labels, answers = session.current()
+        correct_answer = session.all_answers[session.index][1]
+        if rng.random() < bot_accuracy[difficulty]:
+            label = option_labels[answers.index(correct_answer)]
+        else:
+            label = rng.choice(option_labels)
+        session.answer(label)
+
+    summary = session.summary()
+    write_start = time.perf_counter()
+    add_to_leaderboard(bot_name, summary["score"], summary["highest_streak"], summary["questions"],
+                       summary["hints_used"], summary["correct_answers"])
+    end = time.perf_counter()
+    return end - start, end - write_start
+
+
+# Runs a share of the simulated games in one worker process. Everything runs offline against the fake API,
+#   and scores go to the leaderboard files given, shared by every worker
+def run_bot_worker(worker, games, seed, db_file, text_file):
+    global offline_mode, leaderboard, leaderboard_writer, leaderboard_db_file, leaderboard_file
+    offline_mode = True
+    leaderboard_db_file, leaderboard_file = db_file, text_file
+
+    # A forked worker would otherwise share the parent's leaderboard connection
+    leaderboard = None
+    leaderboard_writer = None
+    board_leaderboards.clear()
+    board_writers.clear()
+
+    rng = random.Random(seed + worker)
+    game_times = []
+    write_times = []
+    for game in range(games):
+        game_time, write_time = play_bot_game(f"bot{worker}_{rng.randrange(1000)}", rng)
+        game_times.append(game_time)
+        write_times.append(write_time)
+    return game_times, write_times
+
+
+# Value at a percentile of sorted timings
+def percentile_of(sorted_values, percent):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * percent / 100))]
+
+
+# Simulates many bot players across a process pool and prints games/sec, latency percentiles,
+#   and how long leaderboard writes took, which shows the contention between the workers.
+# Scores go to a leaderboard in a temporary directory unless leaderboard_dir is given
+def run_simulation(games, workers, seed=0, leaderboard_dir=None):
+    from concurrent.futures import ProcessPoolExecutor
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as temporary_dir:
+        directory = leaderboard_dir or temporary_dir
+        db_file = os.path.join(directory, "simulation.db")
+        text_file = os.path.join(directory, "simulation.txt")
+
+        # Creates the database up front, so the workers don't all race to create it
+        if os.environ.get("BRAINSTORM_LEADERBOARD", "sqlite") == "sqlite":
+            SQLiteLeaderboard(db_file).close()
+
+        shares = [games // workers + (1 if worker < games % workers else 0) for worker in range(workers)]
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(run_bot_worker, range(workers), shares, [seed] * workers,
+                                    [db_file] * workers, [text_file] * workers))
+        elapsed = time.perf_counter() - start
+
+    game_times = sorted(time for game_times, _ in results for time in game_times)
+    write_times = sorted(time for _, write_times in results for time in write_times)
+
+    rows = [["Game (ms)"] + [f"{percentile_of(game_times, percent) * 1000:.2f}" for percent in (50, 90, 99)] +
+            [f"{game_times[-1] * 1000:.2f}" if game_times else "0"],
+            ["Leaderboard write (ms)"] + [f"{percentile_of(write_times, percent) * 1000:.2f}" for percent in (50, 90, 99)] +
+            [f"{write_times[-1] * 1000:.2f}" if write_times else "0"]]
+    print(f"\nSimulated {games} games with {workers} worker processes in {elapsed:.2f}s "
+          f"({games / elapsed:.1f} games/sec)")
+    print(render_table(rows, cache=False, headers=["", "p50", "p90", "p99", "Max"], tablefmt="rounded_grid"))
+    print(f"Time spent writing the leaderboard: {sum(write_times) / max(sum(game_times), 1e-9):.0%} of game time\n")
+
+
+# Command line options
+def parse_args():
+    parser = argparse.ArgumentParser(description="Brainstorm Blitz! A terminal trivia game.")
+    parser.add_argument("--offline", action="store_true",
+                        help="play only with questions from the local question bank, without network access")
+    parser.add_argument("--export-leaderboard", metavar="PATH",
+                        help="write the leaderboard in the leaderboard.txt format to PATH and exit")
+    parser.add_argument("--warm-counts", action="store_true",
+                        help="cache the question counts of every category at startup with one request")
+    parser.add_argument("--player", default=player_name,
+                        help="name the seen questions are tracked under, so quizzes skip questions you've had (default: guest)")
+    parser.add_argument("--profile", action="store_true", default=bool(os.environ.get("BRAINSTORM_PROFILE")),
+                        help="time each phase of the game and print a summary at exit (or set BRAINSTORM_PROFILE=1)")
+    parser.add_argument("--profile-json", metavar="PATH", help="with --profile, also write the timings as JSON to PATH")
+    parser.add_argument("--profile-cprofile", metavar="PATH", help="with --profile, also write a cProfile dump to PATH")
+    parser.add_argument("--pack", metavar="PATH",
+                        help="draw quizzes from the question pack at PATH before the local question bank")
+    parser.add_argument("--export-pack", nargs="+", metavar=("PATH", "RESPONSE"),
+                        help="write a question pack to PATH from saved opentdb response files, "
+                             "or from the local question bank if none are given, and exit")
+    parser.add_argument("--simulate", type=int, metavar="GAMES",
+                        help="play GAMES games with bot players against a fake API and report throughput")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="worker processes for --simulate (default: one per CPU)")
+    parser.add_argument("--serve", action="store_true",
+                        help="host quizzes for many players over TCP instead of playing in this terminal")
+    parser.add_argument("--http-leaderboard", type=int, metavar="PORT",
+                        help="serve the leaderboard as JSON over HTTP on PORT instead of playing")
+    parser.add_argument("--board", help="with --http-leaderboard, serve this board instead of the main leaderboard, "
+                                        "for example daily-2026-01-31")
+    parser.add_argument("--host", default="127.0.0.1", help="address the server listens on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=5555, help="port the server listens on (default: 5555)")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    offline_mode = args.offline
+    player_name = args.player
+
+    if args.profile:
+        enable_profiling(args.profile_json, args.profile_cprofile)
+
+    if args.export_leaderboard:
+        export_leaderboard(args.export_leaderboard)
+        sys.exit()
+
+    if args.export_pack:
+        path, *response_files = args.export_pack
+        print(f"Packed {export_question_pack(path, response_files)} questions into {path}")
+        sys.exit()
+
+    if args.pack:
+        try:
+            open_question_pack(args.pack)
+        except (OSError, ValueError) as error:
+            sys.exit(f"Could not open the question pack: {error}")
+
+    # Save the questions drawn from the bank however the game ends
+    atexit.register(flush_question_bank)
+
+    # Warm the question count cache in the background so category selection never waits on the network
+    if args.warm_counts and not offline_mode:
+        start_background_thread(warm_question_counts)
+
+    if args.simulate:
+        run_simulation(args.simulate, max(1, args.workers))
+    elif args.http_leaderboard is not None:
+        try:
+            serve_leaderboard_http(args.host, args.http_leaderboard, args.board)
+        except KeyboardInterrupt:
+            print("Server stopped.")
+    elif args.serve:
+        try:
+            asyncio.run(serve(args.host, args.port))
+        except KeyboardInterrupt:
+            print("Server stopped.")
+    else:
+        run_game()
 
 
 